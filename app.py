@@ -1,27 +1,218 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file, jsonify
+from flask import Flask, Request, Response, render_template, request, redirect, url_for, flash, send_file, jsonify
 import os
+import math
+import hmac
 import uuid
 import time
+from concurrent.futures import as_completed
 from datetime import datetime
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 from config import Config
-from converters.pdf_converter import PDFConverter
-from converters.audio_converter import AudioConverter
-from converters.image_converter import ImageConverter
-from converters.text_converter import TextConverter
-from converters.utils import FileValidator, ConversionLogger, TempFileManager, conversion_stats
+from converters.registry import ConverterRegistry
+from converters.conversions import (CONVERSIONS, Pipeline, get_conversion, get_conversions_for,
+                                    select_pages)
+from converters.utils import FileValidator, FileHasher, ConversionLogger, ZipStreamer, ConversionStats
+from converters.cache import ResultCache
+from converters.jobs import Job, JobManager, current_job
+from converters.executor import ExecutionEngine
+from converters.ingest import IngestedFile, UploadStore, UploadTooLarge
+from converters.metrics import ConversionMetrics
+from converters.stats import StatsStore
+from converters.page_cache import PageCache
+from converters.reaper import ExpiryReaper
+from converters.profiling import ConversionProfiler
+from converters.admission import AdmissionController, AdmissionRejected, measure
+from converters.predictor import DurationPredictor
+from converters.probe import HeaderCapture, probe
+
+# Endpoints whose uploads are streamed straight into the upload folder
+INGEST_ENDPOINTS = {'convert', 'batch_convert'}
+
+class ConverterRequest(Request):
+    """Request that streams conversion uploads to disk while parsing the form
+    
+    Each uploaded file is written to the upload folder in one pass that also
+    hashes it, counts its bytes and keeps its first KB for magic-number
+    checks. Parsing stops with a 413 as soon as an upload exceeds the limit
+    for its file type.
+    """
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        if self.endpoint == 'get_file_info' and filename:
+            return HeaderCapture(app.config['PROBE_SIZE'])
+        if self.endpoint not in INGEST_ENDPOINTS or not filename or not allowed_file(filename):
+            return super()._get_file_stream(total_content_length, content_type,
+                                            filename, content_length)
+        
+        safe_filename = secure_filename(filename)
+        unique_filename = f"{uuid.uuid4()}_{safe_filename}"
+        upload = IngestedFile(
+            upload_store.reference_path(unique_filename),
+            max_size=FileValidator.get_max_size(get_file_type(safe_filename)),
+            store=upload_store
+        )
+        self.ingested_files.append(upload)
+        return upload
+    
+    @property
+    def ingested_files(self):
+        return self.__dict__.setdefault('_ingested_files', [])
+    
+    def _load_form_data(self):
+        try:
+            super()._load_form_data()
+        except UploadTooLarge as e:
+            raise RequestEntityTooLarge(str(e))
 
 app = Flask(__name__)
+app.request_class = ConverterRequest
 app.config.from_object(Config)
 Config.init_app(app)
 
-logger = ConversionLogger()
-temp_manager = TempFileManager()
+logger = ConversionLogger(app.config['LOG_FILE'], structured=app.config['LOG_STRUCTURED'],
+                          async_mode=app.config['LOG_ASYNC'])
+reaper = ExpiryReaper(app.config['TEMP_FILE_LIFETIME'], interval=app.config['REAPER_INTERVAL'],
+                      batch_size=app.config['REAPER_BATCH_SIZE'])
+# Uploads and the content they link to are sharded into subfolders
+reaper.watch(app.config['UPLOAD_FOLDER'], 'upload', recursive=True)
+reaper.watch(app.config['DOWNLOAD_FOLDER'], 'download')
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+result_cache = ResultCache(app.config['RESULT_CACHE_FOLDER'],
+                           max_size_bytes=app.config['RESULT_CACHE_MAX_SIZE'])
+page_cache = (PageCache(app.config['PAGE_CACHE_PATH'],
+                        max_size_bytes=app.config['PAGE_CACHE_MAX_SIZE'])
+              if app.config['PAGE_CACHE_MAX_SIZE'] > 0 else None)
+metrics = ConversionMetrics()
+converter_registry = ConverterRegistry(settings={
+    'PDFConverter': {'workers': app.config['PDF_PARALLEL_WORKERS'],
+                     'parallel_min_pages': app.config['PDF_PARALLEL_MIN_PAGES'],
+                     'page_cache': page_cache}
+})
+conversion_profiler = ConversionProfiler(app.config['PROFILE_FOLDER'],
+                                         sample_rate=app.config['PROFILE_SAMPLE_RATE'])
+conversion_stats = ConversionStats(StatsStore(app.config['STATS_DB_PATH'],
+                                              flush_interval=app.config['STATS_FLUSH_INTERVAL']))
+def warm_converters():
+    """Build the converters and probe external tools when a worker process starts"""
+    converter_registry.warm()
+
+execution_engine = ExecutionEngine(app.config['EXECUTION_LANES'],
+                                   process_lanes=app.config['PROCESS_LANES'],
+                                   max_processes=app.config['PROCESS_POOL_SIZE'],
+                                   metrics=metrics,
+                                   initializer=warm_converters,
+                                   aging=app.config['EXECUTION_AGING'])
+
+def collect_lane_metrics():
+    """Gauge samples for the execution lanes, read at scrape time"""
+    samples = []
+    for lane, lane_stats in execution_engine.get_lane_stats().items():
+        samples.append(('converter_lane_limit', {'lane': lane}, lane_stats['limit']))
+        samples.append(('converter_lane_running', {'lane': lane}, lane_stats['running']))
+        samples.append(('converter_lane_queued', {'lane': lane},
+                        lane_stats['pending'] - lane_stats['running']))
+    return samples
+
+metrics.add_collector(collect_lane_metrics)
+admission = AdmissionController(app.config['ADMISSION_BUDGETS'],
+                                rates={'cpu': app.config['PROCESS_POOL_SIZE'],
+                                       'io': app.config['EXECUTION_LANES']['network']},
+                                max_retry_after=app.config['ADMISSION_MAX_RETRY_AFTER'])
+
+def collect_admission_metrics():
+    admission_stats = admission.get_stats()
+    samples = []
+    for resource, budget in admission_stats['budgets'].items():
+        samples.append(('converter_admission_budget', {'resource': resource}, budget))
+        samples.append(('converter_admission_in_flight', {'resource': resource},
+                        admission_stats['in_flight'].get(resource, 0)))
+    return samples
+
+metrics.add_collector(collect_admission_metrics)
+duration_predictor = DurationPredictor()
+
+def plan_conversion(spec, input_type, path, size, params=None):
+    """Measure an upload once and derive its admission cost and expected duration"""
+    units = measure(input_type, path, size)
+    
+    # Conversions of a page selection only do the work of those pages
+    first_params = (params or {}).get('steps', [params or {}])[0]
+    if input_type == 'pdf' and (first_params.get('pages') or first_params.get('max_pages')):
+        try:
+            units = max(len(select_pages(math.ceil(units), first_params.get('pages'),
+                                         first_params.get('max_pages'))), 1)
+        except ValueError:
+            pass  # The conversion itself reports the empty selection
+    costs = admission.estimate(spec, input_type, units)
+    # The cost model's seconds are the prior until real timings come in
+    expected_duration = duration_predictor.predict(spec.name, units,
+                                                   prior=costs['cpu'] + costs['io'])
+    return units, costs, expected_duration
+job_manager = JobManager(execution_engine,
+                         state_dir=app.config['JOB_FOLDER'],
+                         retention=app.config['TEMP_FILE_LIFETIME'])
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def wants_json():
+    """Whether the client asked for a JSON response instead of HTML"""
+    accept = request.accept_mimetypes
+    return accept['application/json'] > accept['text/html']
+
+def profile_requested():
+    """Whether the request asks for profiling and carries the admin secret"""
+    secret = app.config['ADMIN_SECRET']
+    token = request.headers.get(app.config['PROFILE_HEADER'])
+    return bool(secret and token) and hmac.compare_digest(token.encode(), secret.encode())
+
+def job_response(job):
+    """Public job representation with links to poll and download"""
+    data = job.to_public_dict()
+    data['status_url'] = url_for('job_api_status', job_id=job.id)
+    data['result_url'] = url_for('job_api_result', job_id=job.id)
+    return data
+
+def ingest_upload(file, filename):
+    """Get the IngestedFile for an upload, streaming it to disk if the parser didn't"""
+    if isinstance(file.stream, IngestedFile):
+        return file.stream
+    
+    unique_filename = f"{uuid.uuid4()}_{filename}"
+    upload = IngestedFile(upload_store.reference_path(unique_filename),
+                          max_size=FileValidator.get_max_size(get_file_type(filename)),
+                          store=upload_store)
+    request.ingested_files.append(upload)
+    try:
+        return upload.copy_from(file.stream)
+    except UploadTooLarge as e:
+        raise RequestEntityTooLarge(str(e))
+
+def send_output(file_path, download_name):
+    """Send a converted file with range, ETag and conditional GET support
+    
+    The strong ETag is the SHA-256 of the content, so it stays the same
+    across worker processes and for cache hits of identical outputs.
+    send_file answers Range requests with 206 and If-None-Match /
+    If-Modified-Since with 304. With USE_X_SENDFILE the front-end server
+    sends the file itself; otherwise a WSGI server such as gunicorn
+    uses sendfile() for full responses.
+    """
+    response = send_file(file_path, as_attachment=True, download_name=download_name,
+                         conditional=True, etag=FileHasher.get_cached_hash(file_path))
+    
+    # Output names are unique and never rewritten, so browsers may keep them
+    # for as long as the server does
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    response.cache_control.max_age = int(app.config['TEMP_FILE_LIFETIME'].total_seconds())
+    # Advertise resumable downloads on full responses too
+    response.headers.setdefault('Accept-Ranges', 'bytes')
+    return response
+
 def get_file_type(filename):
     """Determine file type category"""
     ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
@@ -36,12 +227,15 @@ def convert():
     if request.method == 'GET':
         return render_template('convert.html')
     
+    # Turn work away before reading the upload if a budget is used up
+    admission.check()
+    
     if 'file' not in request.files:
         flash('No file selected', 'error')
         return redirect(request.url)
     
     file = request.files['file']
-    conversion_type = request.form.get('conversion_type')
+    conversion_type = request.form.get('conversion_type', '')
     
     if file.filename == '':
         flash('No file selected', 'error')
@@ -52,49 +246,72 @@ def convert():
         return redirect(request.url)
     
     try:
-        # Save uploaded file
+        # The upload was streamed to disk while the form was parsed, and its
+        # size, hash and header were captured in the same pass
         filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        file.save(file_path)
+        upload = ingest_upload(file, filename)
+        unique_filename = upload.filename
+        file_path = upload.path
         
         # Validate file
-        is_valid, validation_message = FileValidator.is_valid_file(file_path)
+        validate_start = time.time()
+        is_valid, validation_message = FileValidator.is_valid_upload(filename, upload.size,
+                                                                     upload.header)
         if not is_valid:
-            os.remove(file_path)  # Clean up invalid file
             flash(f'File validation failed: {validation_message}', 'error')
             return redirect(url_for('convert'))
         
         # Determine conversion type and process
         input_type = get_file_type(filename)
         
+        # Pipelines ("step|step") are checked step by step for a useful message
+        if Pipeline.SEPARATOR in conversion_type:
+            try:
+                conversion_type = Pipeline.parse(conversion_type).name
+            except ValueError as e:
+                flash(f'Invalid pipeline: {str(e)}', 'error')
+                return redirect(url_for('convert'))
+        
         # Validate conversion type
         if not FileValidator.validate_conversion_type(input_type, conversion_type):
-            os.remove(file_path)
             flash(f'Conversion type "{conversion_type}" not supported for {input_type} files', 'error')
             return redirect(url_for('convert'))
         
-        # Log conversion start
-        logger.log_conversion_start(filename, conversion_type)
-        conversion_stats.record_conversion_start(file_path, input_type, conversion_type)
+        spec = get_conversion(conversion_type)
+        try:
+            params = spec.parse_params(request.form)
+        except ValueError as e:
+            flash(f'Invalid conversion options: {str(e)}', 'error')
+            return redirect(url_for('convert'))
         
-        # Perform conversion
-        start_time = time.time()
-        result = perform_conversion(file_path, input_type, conversion_type, unique_filename)
-        conversion_time = time.time() - start_time
+        timings = {'upload': upload.upload_time, 'validate': time.time() - validate_start}
         
-        if result['success']:
-            logger.log_conversion_success(filename, result['filename'], conversion_type, conversion_time)
-            conversion_stats.record_conversion_success(conversion_type, input_type)
-            return render_template('result.html', 
-                                 result=result, 
-                                 original_filename=filename)
-        else:
-            logger.log_conversion_error(filename, conversion_type, result['error'])
-            conversion_stats.record_conversion_failure()
-            flash(f'Conversion failed: {result["error"]}', 'error')
-            return redirect(url_for('convert'))
+        # Raises AdmissionRejected (429) if the job does not fit the budgets
+        units, costs, expected_duration = plan_conversion(spec, input_type, file_path,
+                                                            upload.size, params)
+        ticket = admission.admit(costs)
+        
+        # Queue the conversion (short jobs first) and hand back the job id and ETA
+        try:
+            job = job_manager.submit(
+                conversion_type, run_admitted_job, ticket, file_path, filename, input_type,
+                conversion_type, unique_filename, params, upload.size, upload.content_hash,
+                timings, profile_requested(), units,
+                metadata={'original_filename': filename, 'conversion_type': conversion_type},
+                expected_duration=expected_duration
+            )
+        except Exception:
+            # The job never runs, so its budget is handed back here
+            ticket.release()
+            raise
+        upload.claimed = True
+        
+        if wants_json():
+            return jsonify(job_response(job)), 202
+        return redirect(url_for('job_status', job_id=job.id))
             
+    except (RequestEntityTooLarge, AdmissionRejected):
+        raise
     except Exception as e:
         logger.log_conversion_error(filename if 'filename' in locals() else 'unknown', 
                                   conversion_type if 'conversion_type' in locals() else 'unknown', 
@@ -103,121 +320,143 @@ def convert():
         flash(f'An unexpected error occurred: {str(e)}', 'error')
         return redirect(url_for('convert'))
 
-def perform_conversion(file_path, input_type, conversion_type, unique_filename):
-    """Perform the actual file conversion"""
+def run_admitted_job(ticket, *args, **kwargs):
+    """Run a conversion job, handing its admission budget back when it ends"""
+    with ticket:
+        return run_conversion_job(*args, **kwargs)
+
+def run_conversion_job(file_path, filename, input_type, conversion_type, unique_filename, options,
+                       file_size=None, content_hash=None, timings=None, profile=False, units=None):
+    """Run one conversion in its execution lane, with logging and stats
+    
+    Sampled conversions, and those with ``profile`` set, are profiled.
+    Conversions that ran (not cache hits) train the duration predictor on
+    their ``units`` of input.
+    """
+    job = current_job()
+    job_id = job.id if job else None
+    timings = dict(timings or {})
+    if job is not None:
+        timings['queue'] = job.started_at - job.created_at
+    
+    logger.log_conversion_start(filename, conversion_type, job_id=job_id, input_hash=content_hash,
+                                input_size=file_size)
+    conversion_stats.record_conversion_start(file_path, input_type, conversion_type, file_size)
+    metrics.inc('converter_conversions_in_flight', conversion_type=conversion_type)
+    
+    func = perform_conversion
+    args = (file_path, input_type, conversion_type, unique_filename, options, content_hash)
+    if conversion_profiler.should_profile(profile):
+        func = profile_conversion
+        args = (job_id or unique_filename.rsplit('.', 1)[0],) + args
+    
+    start_time = time.time()
     try:
-        base_name = unique_filename.rsplit('.', 1)[0]
-        output_path = None
-        
-        if input_type == 'pdf':
-            converter = PDFConverter()
-            if conversion_type == 'pdf_to_docx':
-                output_path = converter.pdf_to_docx(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.docx"))
-            elif conversion_type == 'pdf_to_audio':
-                output_path = converter.pdf_to_audio(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.mp3"))
-            elif conversion_type == 'pdf_to_txt':
-                output_path = converter.pdf_to_txt(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.txt"))
-        
-        elif input_type == 'audio':
-            converter = AudioConverter()
-            if conversion_type == 'audio_to_text':
-                output_path = converter.audio_to_text(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.txt"))
-            elif conversion_type == 'audio_format':
-                target_format = request.form.get('target_format', 'mp3')
-                output_path = converter.convert_audio_format(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.{target_format}"))
-            elif conversion_type == 'audio_compress':
-                bitrate = request.form.get('bitrate', '64k')
-                output_path = converter.compress_audio(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_compressed.mp3"),
-                    bitrate)
-            elif conversion_type == 'audio_normalize':
-                output_path = converter.normalize_audio(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_normalized.mp3"))
-            elif conversion_type == 'audio_trim':
-                start_time = float(request.form.get('start_time', 0))
-                end_time = request.form.get('end_time')
-                end_time = float(end_time) if end_time else None
-                output_path = converter.trim_audio(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_trimmed.mp3"),
-                    start_time, end_time)
-            elif conversion_type == 'audio_speed':
-                speed_factor = float(request.form.get('speed_factor', 1.0))
-                output_path = converter.change_audio_speed(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_speed.mp3"),
-                    speed_factor)
+        # CPU-bound conversions run in the process pool, outside the GIL
+        # A requested profile must measure the conversion, not a cache hit
+        result = execution_engine.execute(conversion_type, func, *args, use_cache=not profile)
+    finally:
+        metrics.dec('converter_conversions_in_flight', conversion_type=conversion_type)
+    conversion_time = time.time() - start_time
+    
+    profile_fields = {}
+    if result.get('profile'):
+        profile_fields['profile'] = result['profile']
+        for path in result['profile'].values():
+            reaper.track(path, 'profile', lifetime=app.config['PROFILE_LIFETIME'].total_seconds())
+    timings.update(result.get('timings', {}))
+    timings = {stage: round(seconds, 4) for stage, seconds in timings.items() if seconds is not None}
+    
+    conversion_stats.record_cache_lookup(result.get('cache_hit', False))
+    metrics.inc('converter_cache_lookups_total',
+                result='hit' if result.get('cache_hit') else 'miss')
+    metrics.record_conversion(conversion_type, conversion_time, file_size,
+                              result.get('file_size'), result['success'])
+    
+    if result['success'] and not result['cache_hit'] and units is not None:
+        duration_predictor.observe(conversion_type, units, result['timings']['convert'])
+    
+    if result['success']:
+        result['conversion_time'] = conversion_time
+        # Hashed by the conversion worker; reuse it as the download ETag
+        FileHasher.remember_hash(result['output_path'], result['output_hash'])
+        reaper.track(result['output_path'], 'download')
+        logger.log_conversion_success(filename, result['filename'], conversion_type, conversion_time,
+                                      job_id=job_id, input_hash=content_hash, input_size=file_size,
+                                      output_size=result['file_size'],
+                                      cache_hit=result['cache_hit'], timings=timings,
+                                      **profile_fields)
+        conversion_stats.record_conversion_success(conversion_type, input_type)
+    else:
+        logger.log_conversion_error(filename, conversion_type, result['error'], job_id=job_id,
+                                    input_hash=content_hash, input_size=file_size,
+                                    timings=timings, **profile_fields)
+        conversion_stats.record_conversion_failure()
+    
+    return result
+
+def profile_conversion(profile_id, *args, **kwargs):
+    """Run perform_conversion under cProfile and tracemalloc
+    
+    The paths of the saved profile files are added to the result.
+    """
+    result, profile = conversion_profiler.run(profile_id, perform_conversion, *args, **kwargs)
+    result['profile'] = profile
+    return result
+
+def perform_conversion(file_path, input_type, conversion_type, unique_filename, options=None,
+                       content_hash=None, use_cache=True):
+    """Perform the actual file conversion
+    
+    Needs no request context, so it runs the same in worker processes and
+    batch jobs. ``options`` may be raw form values or already parsed params.
+    With ``use_cache`` off the conversion runs even if a cached result exists.
+    """
+    timings = {}
+    try:
+        spec = get_conversion(conversion_type)
+        if spec is None:
+            raise Exception(f"Unsupported conversion type: {conversion_type}")
+        params = spec.parse_params(options)
         
-        elif input_type == 'image':
-            converter = ImageConverter()
-            if conversion_type == 'image_to_pdf':
-                output_path = converter.image_to_pdf(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.pdf"))
-            elif conversion_type == 'image_to_text':
-                output_path = converter.image_to_text(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.txt"))
-            elif conversion_type == 'image_resize':
-                width = int(request.form.get('width', 800))
-                height = int(request.form.get('height', 600))
-                maintain_aspect = request.form.get('maintain_aspect', 'true') == 'true'
-                output_path = converter.resize_image(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_resized.jpg"),
-                    (width, height), maintain_aspect)
-            elif conversion_type == 'image_format':
-                target_format = request.form.get('target_format', 'jpg')
-                output_path = converter.convert_image_format(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.{target_format}"))
-            elif conversion_type == 'image_compress':
-                quality = int(request.form.get('quality', 85))
-                output_path = converter.compress_image(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_compressed.jpg"),
-                    quality)
-            elif conversion_type == 'image_filter':
-                filter_type = request.form.get('filter_type', 'enhance')
-                output_path = converter.apply_image_filter(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_filtered.jpg"),
-                    filter_type)
-            elif conversion_type == 'image_rotate':
-                angle = int(request.form.get('rotate_angle', 90))
-                output_path = converter.rotate_image(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}_rotated.jpg"),
-                    angle)
+        base_name = unique_filename.rsplit('.', 1)[0]
+        base_path = os.path.join(app.config['DOWNLOAD_FOLDER'], base_name)
         
-        elif input_type == 'document':
-            converter = TextConverter()
-            if conversion_type == 'text_to_audio':
-                engine = request.form.get('tts_engine', 'gtts')
-                output_path = converter.text_to_audio(file_path, 
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.mp3"),
-                    engine)
-            elif conversion_type == 'txt_to_docx':
-                output_path = converter.txt_to_docx(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.docx"))
-            elif conversion_type == 'docx_to_txt':
-                output_path = converter.docx_to_txt(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.txt"))
+        # Repeated conversions of the same content are served from the cache
+        content_hash = content_hash or FileHasher.get_file_hash(file_path, 'sha256')
+        # Lets the converters key their own caches without rereading the file
+        FileHasher.remember_hash(file_path, content_hash)
+        cache_key = ResultCache.make_key(content_hash, spec.name, params)
+        stage_start = time.time()
+        output_path = result_cache.get(cache_key, base_path) if use_cache else None
+        cache_hit = output_path is not None
+        timings['cache_lookup'] = time.time() - stage_start
         
-        elif input_type == 'video':
-            converter = AudioConverter()  # Using AudioConverter for video to audio
-            if conversion_type == 'video_to_audio':
-                target_format = request.form.get('audio_format', 'mp3')
-                output_path = converter.extract_audio_from_video(file_path,
-                    os.path.join(app.config['DOWNLOAD_FOLDER'], f"{base_name}.{target_format}"))
+        stage_start = time.time()
+        if not cache_hit:
+            output_path = run_converter(file_path, spec, base_name, params)
+            timings['convert'] = time.time() - stage_start
+            stage_start = time.time()
+            if output_path and os.path.exists(output_path):
+                result_cache.put(cache_key, base_path, output_path)
         
         # Clean up uploaded file
         if os.path.exists(file_path):
             os.remove(file_path)
         
         if output_path and os.path.exists(output_path):
+            output_hash = FileHasher.get_cached_hash(output_path)
+            # Storing the output: caching and hashing it, or linking it from the cache
+            timings['write'] = time.time() - stage_start
             return {
                 'success': True,
                 'output_path': output_path,
                 'filename': os.path.basename(output_path),
                 'conversion_type': conversion_type,
-                'file_size': os.path.getsize(output_path)
+                'file_size': os.path.getsize(output_path),
+                'output_hash': output_hash,
+                'cache_hit': cache_hit,
+                'timings': timings
             }
         else:
             return {
@@ -235,16 +474,139 @@ def perform_conversion(file_path, input_type, conversion_type, unique_filename):
         
         return {
             'success': False,
-            'error': str(e)
+            'error': str(e),
+            'timings': timings
         }
 
+def run_converter(file_path, spec, base_name, params):
+    """Call the converter method for a conversion spec and return the output path"""
+    output_path = os.path.join(app.config['DOWNLOAD_FOLDER'], spec.output_name(base_name, params))
+    return spec.run(converter_registry, file_path, output_path, params)
+
+@app.route('/api/batch', methods=['POST'])
+def batch_convert():
+    """API endpoint to convert many files with the same settings
+    
+    The files are converted in parallel in their execution lane and the
+    outputs are streamed back as a ZIP archive built while conversions
+    finish. Files that fail are listed in errors.txt inside the archive.
+    """
+    request.max_content_length = app.config['BATCH_MAX_CONTENT_LENGTH']
+    admission.check()
+    conversion_type = request.form.get('conversion_type', '')
+    files = [file for file in request.files.getlist('files') + request.files.getlist('file')
+             if file.filename]
+    
+    if not files:
+        return jsonify({'error': 'No files provided'}), 400
+    if len(files) > app.config['BATCH_MAX_FILES']:
+        return jsonify({'error': f"Too many files. Maximum is {app.config['BATCH_MAX_FILES']}"}), 400
+    
+    if Pipeline.SEPARATOR in conversion_type:
+        try:
+            conversion_type = Pipeline.parse(conversion_type).name
+        except ValueError as e:
+            return jsonify({'error': f'Invalid pipeline: {str(e)}'}), 400
+    
+    spec = get_conversion(conversion_type)
+    if spec is None:
+        return jsonify({'error': f'Unsupported conversion type: {conversion_type}'}), 400
+    try:
+        params = spec.parse_params(request.form)
+    except ValueError as e:
+        return jsonify({'error': f'Invalid conversion options: {str(e)}'}), 400
+    
+    errors = []
+    accepted = []
+    
+    for file in files:
+        filename = secure_filename(file.filename)
+        input_type = get_file_type(filename)
+        
+        if not allowed_file(filename):
+            errors.append(f"{filename}: File type not supported")
+            continue
+        if not FileValidator.validate_conversion_type(input_type, conversion_type):
+            errors.append(f'{filename}: Conversion type "{conversion_type}" not supported for {input_type} files')
+            continue
+        
+        upload = ingest_upload(file, filename)
+        is_valid, validation_message = FileValidator.is_valid_upload(filename, upload.size,
+                                                                     upload.header)
+        if not is_valid:
+            errors.append(f"{filename}: {validation_message}")
+            continue
+        accepted.append((upload, filename, input_type))
+    
+    if not accepted:
+        return jsonify({'error': 'No valid files to convert', 'details': errors}), 400
+    
+    # The batch is admitted as a whole, or rejected with 429
+    plans = [plan_conversion(spec, input_type, upload.path, upload.size, params)
+             for upload, _, input_type in accepted]
+    tickets = admission.admit_all([costs for _, costs, _ in plans])
+    
+    futures = {}
+    profile = profile_requested()
+    try:
+        for ticket, (units, _, expected_duration), (upload, filename, input_type) in zip(
+                tickets, plans, accepted):
+            future = execution_engine.submit(
+                conversion_type, run_admitted_job, ticket, upload.path, filename, input_type,
+                conversion_type, upload.filename, params, upload.size, upload.content_hash,
+                profile=profile, units=units, expected_duration=expected_duration
+            )
+            upload.claimed = True
+            futures[future] = filename
+    except Exception:
+        # Queued jobs hand their budget back when they end; the rest never run
+        for ticket in tickets[len(futures):]:
+            ticket.release()
+        raise
+    
+    def batch_entries():
+        used_names = set()
+        for future in as_completed(futures):
+            filename = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {'success': False, 'error': str(e)}
+            
+            if not result['success']:
+                errors.append(f"{filename}: {result['error']}")
+                continue
+            
+            # Drop the unique prefix, keeping names inside the archive distinct
+            arcname = result['filename'].split('_', 1)[-1]
+            stem, ext = os.path.splitext(arcname)
+            counter = 1
+            while arcname in used_names:
+                arcname = f"{stem}_{counter}{ext}"
+                counter += 1
+            used_names.add(arcname)
+            
+            try:
+                yield arcname, result['output_path']
+            finally:
+                # The entry is fully written once the next one is requested
+                if os.path.exists(result['output_path']):
+                    os.remove(result['output_path'])
+        
+        if errors:
+            yield 'errors.txt', '\n'.join(errors).encode('utf-8')
+    
+    archive_name = f"converted_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+    return Response(ZipStreamer.stream(batch_entries()), mimetype='application/zip',
+                    headers={'Content-Disposition': f'attachment; filename={archive_name}'})
+
 @app.route('/download/<filename>')
 def download_file(filename):
     """Download converted file"""
     file_path = os.path.join(app.config['DOWNLOAD_FOLDER'], filename)
-    if os.path.exists(file_path):
+    if os.path.isfile(file_path):
         try:
-            return send_file(file_path, as_attachment=True, download_name=filename)
+            return send_output(file_path, filename)
         except Exception as e:
             flash(f'Download failed: {str(e)}', 'error')
             return redirect(url_for('index'))
@@ -252,25 +614,97 @@ def download_file(filename):
         flash('File not found or has expired', 'error')
         return redirect(url_for('index'))
 
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Progress page for a queued conversion"""
+    job = job_manager.get(job_id)
+    if job is None:
+        flash('Job not found or has expired', 'error')
+        return redirect(url_for('convert'))
+    
+    if job.status == Job.COMPLETED:
+        return render_template('result.html', 
+                             result=job.result, 
+                             original_filename=job.metadata.get('original_filename'))
+    if job.status == Job.FAILED:
+        flash(f'Conversion failed: {job.error}', 'error')
+        return redirect(url_for('convert'))
+    
+    return render_template('job.html', job=job)
+
+@app.route('/api/jobs/<job_id>')
+def job_api_status(job_id):
+    """API endpoint to get the status of a conversion job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job_response(job))
+
+@app.route('/api/jobs/<job_id>/result')
+def job_api_result(job_id):
+    """API endpoint to download the output of a finished job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    if job.status == Job.FAILED:
+        return jsonify({'error': job.error, 'status': job.status}), 422
+    if job.status != Job.COMPLETED:
+        return jsonify(job_response(job)), 202
+    
+    output_path = job.result['output_path']
+    if not os.path.exists(output_path):
+        return jsonify({'error': 'File not found or has expired'}), 410
+    return send_output(output_path, job.result['filename'])
+
 @app.route('/api/supported_conversions')
 def supported_conversions():
     """API endpoint to get supported conversion types"""
     return jsonify({
-        'pdf': FileValidator.get_supported_conversions('pdf'),
-        'document': FileValidator.get_supported_conversions('document'),
-        'image': FileValidator.get_supported_conversions('image'),
-        'audio': FileValidator.get_supported_conversions('audio'),
-        'video': FileValidator.get_supported_conversions('video')
+        'pdf': get_conversions_for('pdf'),
+        'document': get_conversions_for('document'),
+        'image': get_conversions_for('image'),
+        'audio': get_conversions_for('audio'),
+        'video': get_conversions_for('video')
     })
+
+@app.route('/api/conversions')
+def conversion_specs():
+    """API endpoint describing each conversion, its parameters and cost class"""
+    return jsonify({name: spec.to_dict() for name, spec in CONVERSIONS.items()})
+
+@app.route('/api/capabilities')
+def capabilities():
+    """API endpoint to get the external tools the converters can use"""
+    return jsonify(converter_registry.get_capabilities())
     
 @app.route('/api/stats')
 def conversion_statistics():
     """API endpoint to get conversion statistics"""
-    return jsonify(conversion_stats.get_stats_summary())
+    summary = conversion_stats.get_stats_summary()
+    summary['execution_lanes'] = execution_engine.get_lane_stats()
+    summary['latency'] = metrics.get_latency_summary()
+    summary['admission'] = admission.get_stats()
+    summary['duration_model'] = duration_predictor.get_stats()
+    summary['upload_store'] = upload_store.get_stats()
+    if page_cache is not None:
+        summary['page_cache'] = page_cache.get_stats()
+    return jsonify(summary)
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Conversion metrics in the Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/api/file_info', methods=['POST'])
 def get_file_info():
-    """API endpoint to get file information"""
+    """API endpoint to get file information
+    
+    Only the first PROBE_SIZE bytes of the upload are kept (see
+    ConverterRequest), which is enough for the magic number and container
+    headers. Clients can send just that slice of the file along with its
+    real size in ``file_size``.
+    """
     try:
         if 'file' not in request.files:
             return jsonify({'error': 'No file provided'}), 400
@@ -279,17 +713,18 @@ def get_file_info():
         if file.filename == '':
             return jsonify({'error': 'No file selected'}), 400
         
-        # Create temporary file to analyze
-        temp_path = temp_manager.create_temp_file(suffix=f'.{file.filename.split(".")[-1]}')
-        file.save(temp_path)
+        capture = file.stream
+        header = capture.header
+        declared_size = request.form.get('file_size', type=int)
+        file_size = max(declared_size or 0, capture.size)
         
-        # Get file info
         file_type = get_file_type(file.filename)
-        is_valid, validation_message = FileValidator.is_valid_file(temp_path)
-        file_size = os.path.getsize(temp_path)
-        
-        # Clean up temp file
-        temp_manager.cleanup_file(temp_path)
+        is_valid, validation_message = FileValidator.is_valid_upload(file.filename, file_size,
+                                                                     header)
+        details = {'format': None}
+        if is_valid:
+            ffprobe = converter_registry.get_capabilities()['ffprobe']['path']
+            details = probe(header, file_size, ffprobe=ffprobe)
         
         return jsonify({
             'filename': file.filename,
@@ -297,6 +732,7 @@ def get_file_info():
             'file_size': file_size,
             'is_valid': is_valid,
             'validation_message': validation_message,
+            'details': details,
             'supported_conversions': FileValidator.get_supported_conversions(file_type)
         })
     
@@ -305,32 +741,24 @@ def get_file_info():
 
 @app.route('/cleanup')
 def cleanup_files():
-    """Clean up old files (admin endpoint)"""
+    """Clean up old files (admin endpoint)
+    
+    Expired files are normally deleted by the background reaper; this
+    deletes everything that is already due right away, including files
+    in folders the background scan hasn't reached yet.
+    """
     try:
-        cleaned_count = temp_manager.cleanup_old_files()
-        
-        # Also clean up old files in download folder
-        download_folder = app.config['DOWNLOAD_FOLDER']
-        cleaned_downloads = 0
-        
-        if os.path.exists(download_folder):
-            current_time = datetime.now()
-            for filename in os.listdir(download_folder):
-                file_path = os.path.join(download_folder, filename)
-                try:
-                    file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    if current_time - file_time > app.config.get('TEMP_FILE_LIFETIME', 
-                                                               temp_manager.max_age):
-                        os.remove(file_path)
-                        cleaned_downloads += 1
-                except:
-                    continue
+        reaper.start()
+        reaper.finish_scans()
+        removed = reaper.reap(limit=reaper.get_stats()['heap_size'])
         
         return jsonify({
             'success': True,
-            'cleaned_temp_files': cleaned_count,
-            'cleaned_downloads': cleaned_downloads,
-            'total_cleaned': cleaned_count + cleaned_downloads
+            'cleaned_temp_files': removed.get('temp', 0),
+            'cleaned_uploads': removed.get('upload', 0),
+            'cleaned_downloads': removed.get('download', 0),
+            'total_cleaned': sum(removed.values()),
+            'reaper': reaper.get_stats()
         })
     
     except Exception as e:
@@ -346,9 +774,39 @@ def internal_error(error):
 
 @app.errorhandler(413)
 def too_large(error):
-    flash('File too large. Maximum file size is 50MB.', 'error')
+    message = getattr(error, 'description', None)
+    if not message or message == RequestEntityTooLarge.description:
+        message = f"File too large. Maximum file size is {app.config['MAX_CONTENT_LENGTH'] // (1024 * 1024)}MB."
+    if wants_json():
+        return jsonify({'error': message}), 413
+    flash(message, 'error')
     return redirect(url_for('convert'))
 
+@app.errorhandler(AdmissionRejected)
+def overloaded(error):
+    metrics.inc('converter_admission_rejected_total', resource=error.resource)
+    headers = {'Retry-After': str(error.retry_after)}
+    if wants_json() or request.endpoint == 'batch_convert':
+        return jsonify({'error': str(error), 'retry_after': error.retry_after}), 429, headers
+    flash(str(error), 'error')
+    return render_template('convert.html'), 429, headers
+
+@app.teardown_request
+def discard_unclaimed_uploads(error=None):
+    """Remove streamed uploads that were rejected before reaching a job
+    
+    The stored content they link to expires on its own, a lifetime after
+    its last upload, so identical uploads until then are only linked.
+    """
+    for upload in getattr(request, 'ingested_files', []):
+        if upload.finished_at is not None:
+            reaper.track(upload_store.object_path(upload.content_hash), 'upload')
+        if not upload.claimed:
+            upload.discard()
+        else:
+            # The job removes it when done; expire it in case the job never runs
+            reaper.track(upload.path, 'upload')
+
 # Context processor to add utility functions to templates
 @app.context_processor
 def utility_processor():
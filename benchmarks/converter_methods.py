@@ -0,0 +1,312 @@
+"""Measure the converter methods on generated fixtures
+
+Builds its own inputs (multi-page PDFs with reportlab, large JPEG/PNG/TIFF
+images with Pillow, sine-wave audio with pydub, long DOCX and text files
+with python-docx), so it needs no network and no sample files. Every case
+runs in a fresh interpreter and reports wall time, peak RSS and
+throughput per method and input size.
+
+    python benchmarks/converter_methods.py
+    python benchmarks/converter_methods.py --sizes small,medium,large --only image
+    python benchmarks/converter_methods.py --only pdf_to_txt --sizes huge
+    python benchmarks/converter_methods.py --json converter_methods.json
+    python benchmarks/converter_methods.py --compare converter_methods.json --threshold 10
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+LOREM = ("Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+         "incididunt ut labore et dolore magna aliqua.")
+
+# Input size per fixture kind: PDF pages, DOCX/TXT paragraphs, image
+# dimensions and audio seconds
+SIZES = {
+    'small': {'pdf': 20, 'docx': 200, 'txt': 200, 'image': (1024, 768), 'audio': 10},
+    'medium': {'pdf': 100, 'docx': 1000, 'txt': 1000, 'image': (2048, 1536), 'audio': 60},
+    'large': {'pdf': 300, 'docx': 5000, 'txt': 5000, 'image': (4096, 3072), 'audio': 300},
+    'huge': {'pdf': 1000, 'docx': 20000, 'txt': 20000, 'image': (8192, 6144), 'audio': 1200}
+}
+
+
+class Case:
+    """One converter method called on one kind of fixture"""
+
+    def __init__(self, name, input_type, fixture, method, output_suffix, kwargs=None,
+                 requires=None):
+        self.name = name
+        self.input_type = input_type  # Converter registry key
+        self.fixture = fixture
+        self.method = method
+        self.output_suffix = output_suffix
+        self.kwargs = kwargs or {}
+        self.requires = requires  # External tool from the registry's capabilities
+
+
+CASES = [
+    Case('pdf_to_txt.fitz', 'pdf', 'pdf', 'pdf_to_txt', '.txt', {'engine': 'fitz'}),
+    Case('pdf_to_txt.pdfplumber', 'pdf', 'pdf', 'pdf_to_txt', '.txt', {'engine': 'pdfplumber'}),
+    # Single-process extraction, to compare with the parallel default above
+    Case('pdf_to_txt.fitz.serial', 'pdf', 'pdf', 'pdf_to_txt', '.txt',
+         {'engine': 'fitz', 'workers': 1}),
+    Case('pdf_to_txt.pdfplumber.serial', 'pdf', 'pdf', 'pdf_to_txt', '.txt',
+         {'engine': 'pdfplumber', 'workers': 1}),
+    Case('pdf_to_docx', 'pdf', 'pdf', 'pdf_to_docx', '.docx'),
+    Case('pdf_to_docx.fitz', 'pdf', 'pdf', 'pdf_to_docx', '.docx', {'engine': 'fitz'}),
+    Case('docx_to_txt', 'document', 'docx', 'docx_to_txt', '.txt'),
+    Case('txt_to_docx', 'document', 'txt', 'txt_to_docx', '.docx'),
+    Case('resize_image', 'image', 'jpg', 'resize_image', '.jpg', {'size': (800, 600)}),
+    Case('compress_image', 'image', 'jpg', 'compress_image', '.jpg', {'quality': 60}),
+    Case('apply_image_filter', 'image', 'jpg', 'apply_image_filter', '.jpg',
+         {'filter_type': 'sharpen'}),
+    Case('rotate_image', 'image', 'jpg', 'rotate_image', '.jpg', {'angle': 90}),
+    Case('convert_image_format.png', 'image', 'png', 'convert_image_format', '.jpg',
+         {'target_format': 'jpg'}),
+    Case('convert_image_format.tiff', 'image', 'tiff', 'convert_image_format', '.png',
+         {'target_format': 'png'}),
+    Case('image_to_pdf', 'image', 'jpg', 'image_to_pdf', '.pdf'),
+    Case('image_to_text', 'image', 'png', 'image_to_text', '.txt', requires='tesseract'),
+    Case('convert_audio_format.wav', 'audio', 'wav', 'convert_audio_format', '.mp3',
+         {'target_format': 'mp3'}, requires='ffmpeg'),
+    Case('convert_audio_format.mp3', 'audio', 'mp3', 'convert_audio_format', '.wav',
+         {'target_format': 'wav'}, requires='ffmpeg'),
+    Case('compress_audio', 'audio', 'wav', 'compress_audio', '.mp3', {'bitrate': '64k'},
+         requires='ffmpeg'),
+    Case('normalize_audio', 'audio', 'wav', 'normalize_audio', '.mp3', requires='ffmpeg'),
+    Case('trim_audio', 'audio', 'wav', 'trim_audio', '.mp3', {'start_time': 1.0},
+         requires='ffmpeg'),
+    Case('change_audio_speed', 'audio', 'wav', 'change_audio_speed', '.mp3',
+         {'speed_factor': 1.5}, requires='ffmpeg')
+]
+
+
+def make_pdf(path, pages):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+
+    pdf = canvas.Canvas(path, pagesize=letter)
+    for page in range(pages):
+        text = pdf.beginText(40, 750)
+        text.setFont('Helvetica', 8)
+        for line in range(60):
+            text.textLine(f"Page {page + 1}, line {line + 1}: {LOREM}")
+        pdf.drawText(text)
+        pdf.showPage()
+    pdf.save()
+    return pages, 'pages'
+
+
+def make_docx(path, paragraphs):
+    from docx import Document
+
+    doc = Document()
+    for index in range(paragraphs):
+        if index % 50 == 0:
+            doc.add_heading(f"Section {index // 50 + 1}", level=1)
+        doc.add_paragraph(f"{index + 1}. {LOREM} {LOREM}")
+    doc.save(path)
+    return paragraphs, 'paragraphs'
+
+
+def make_txt(path, paragraphs):
+    with open(path, 'w', encoding='utf-8') as txt_file:
+        for index in range(paragraphs):
+            txt_file.write(f"{index + 1}. {LOREM} {LOREM}\n\n")
+    return paragraphs, 'paragraphs'
+
+
+def make_image(path, size):
+    from PIL import Image
+
+    # Noise over a gradient: compresses like a photo rather than a flat fill
+    width, height = size
+    noise = [Image.effect_noise(size, 40) for _ in range(3)]
+    gradient = Image.linear_gradient('L').resize(size)
+    channels = [Image.blend(channel, gradient, 0.5) for channel in noise]
+    Image.merge('RGB', channels).save(path)
+    return round(width * height / 1e6, 2), 'megapixels'
+
+
+def make_audio(path, seconds):
+    from pydub.generators import Sine
+
+    tone = Sine(440).to_audio_segment(duration=seconds * 1000, volume=-12)
+    stereo = tone.overlay(Sine(660).to_audio_segment(duration=seconds * 1000, volume=-18))
+    stereo.set_channels(2).export(path, format=os.path.splitext(path)[1][1:])
+    return seconds, 'seconds'
+
+
+# Fixture kind -> (size key, generator)
+FIXTURES = {
+    'pdf': ('pdf', make_pdf),
+    'docx': ('docx', make_docx),
+    'txt': ('txt', make_txt),
+    'jpg': ('image', make_image),
+    'png': ('image', make_image),
+    'tiff': ('image', make_image),
+    'wav': ('audio', make_audio),
+    'mp3': ('audio', make_audio)
+}
+
+
+def get_fixture(fixture_dir, kind, size):
+    """Generate a fixture unless an earlier run left it in ``fixture_dir``"""
+    size_key, generate = FIXTURES[kind]
+    path = os.path.join(fixture_dir, f"{size}.{kind}")
+    meta_path = path + '.json'
+    if os.path.exists(path) and os.path.exists(meta_path):
+        with open(meta_path, 'r', encoding='utf-8') as meta_file:
+            return path, tuple(json.load(meta_file))
+
+    units = generate(path, SIZES[size][size_key])
+    with open(meta_path, 'w', encoding='utf-8') as meta_file:
+        json.dump(units, meta_file)
+    return path, units
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(name, input_path, runs):
+    """Time one case in this interpreter and print the result as JSON"""
+    from converters.registry import ConverterRegistry
+
+    case = next(case for case in CASES if case.name == name)
+    converter = ConverterRegistry().get(case.input_type)
+    method = getattr(converter, case.method)
+
+    rss_before = peak_rss_mb()
+    best = None
+    with tempfile.TemporaryDirectory() as output_dir:
+        output_path = os.path.join(output_dir, 'output' + case.output_suffix)
+        for _ in range(runs):
+            start = time.perf_counter()
+            method(input_path, output_path, **case.kwargs)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+            os.remove(output_path)
+    rss_after = peak_rss_mb()
+
+    print(json.dumps({
+        'seconds': best,
+        'peak_rss_mb': rss_after,
+        'rss_growth_mb': rss_after - rss_before if rss_after is not None else None
+    }))
+
+
+def measure(case, input_path, runs):
+    """Run a case in a fresh interpreter, so its peak RSS is its own"""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--case', case.name, '--input', input_path,
+         '--runs', str(runs)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines() or ['no output']
+        raise Exception(f"Benchmark {case.name} failed: {lines[-1]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='small,medium',
+                        help=f"comma-separated input sizes ({', '.join(SIZES)})")
+    parser.add_argument('--only', help='run the cases whose name or input type contains this')
+    parser.add_argument('--runs', type=int, default=3, help='calls per case (fastest is kept)')
+    parser.add_argument('--fixtures', metavar='DIR',
+                        help='keep generated fixtures here and reuse them on later runs')
+    parser.add_argument('--json', metavar='PATH', help='write the results to a JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='compare against an earlier --json file')
+    parser.add_argument('--threshold', type=float, metavar='PERCENT',
+                        help='with --compare, exit 1 if a case got slower by more than this')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    parser.add_argument('--input', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        run_case(args.case, args.input, args.runs)
+        return
+
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    for size in sizes:
+        if size not in SIZES:
+            parser.error(f"unknown size {size!r}")
+
+    cases = [case for case in CASES
+             if not args.only or args.only in case.name or args.only == case.input_type]
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    from converters.registry import ConverterRegistry
+    capabilities = ConverterRegistry().get_capabilities()
+
+    fixture_dir = args.fixtures or tempfile.mkdtemp(prefix='converter-benchmarks-')
+    os.makedirs(fixture_dir, exist_ok=True)
+
+    results = {}
+    regressions = []
+    try:
+        for case in cases:
+            if case.requires and not capabilities[case.requires]['available']:
+                print(f"{case.name:<28} skipped ({case.requires} not found)")
+                continue
+
+            for size in sizes:
+                input_path, (units, unit_name) = get_fixture(fixture_dir, case.fixture, size)
+                input_mb = os.path.getsize(input_path) / (1024 * 1024)
+                result = measure(case, input_path, args.runs)
+                result.update({
+                    'input_mb': round(input_mb, 3),
+                    'units': units,
+                    'unit': unit_name,
+                    'units_per_second': units / result['seconds'],
+                    'mb_per_second': input_mb / result['seconds']
+                })
+                key = f"{case.name}[{size}]"
+                results[key] = result
+
+                label = f"{units} {unit_name}"
+                line = (f"{case.name:<28} {size:<7} {label:<18} {result['seconds']:9.3f} s "
+                        f"{result['peak_rss_mb']:8.1f} MB peak "
+                        f"{result['units_per_second']:10.1f} {unit_name}/s "
+                        f"{result['mb_per_second']:8.3f} MB/s")
+                if key in baseline:
+                    change = (result['seconds'] / baseline[key]['seconds'] - 1) * 100
+                    rss_change = result['peak_rss_mb'] - baseline[key]['peak_rss_mb']
+                    line += f"  ({change:+.1f}% time, {rss_change:+.1f} MB peak vs baseline)"
+                    if args.threshold is not None and change > args.threshold:
+                        regressions.append(f"{key}: {change:+.1f}%")
+                print(line, flush=True)
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(fixture_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if regressions:
+        print(f"Slower than the baseline by more than {args.threshold}%: " + ', '.join(regressions))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
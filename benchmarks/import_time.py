@@ -0,0 +1,106 @@
+"""Report how long the app and each converter module take to import
+
+Runs ``python -X importtime`` in a fresh interpreter for every target and
+summarizes the output, so startup regressions (e.g. a heavy dependency
+imported at module level again) show up as numbers that can be tracked.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --json import_times.json
+    python benchmarks/import_time.py --compare import_times.json
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    'app',
+    'converters',
+    'converters.pdf_converter',
+    'converters.image_converter',
+    'converters.audio_converter',
+    'converters.text_converter'
+]
+
+
+def measure(target, runs=3):
+    """Import ``target`` in fresh interpreters and keep the fastest run
+
+    Returns ``(total_us, [(cumulative_us, self_us, module), ...])`` where
+    the modules are the ones imported on behalf of ``target`` (not those
+    the interpreter loads at startup).
+    """
+    best = None
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            raise Exception(f"Importing {target} failed: {result.stderr.strip().splitlines()[-1]}")
+
+        lines = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'imported package' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            lines.append((int(cumulative_us), int(self_us), name[1:]))
+
+        # Children are reported before their parent, indented one level
+        # deeper; the target's subtree is the indented run just before it
+        total, modules = 0, []
+        for index, (cumulative, _, name) in enumerate(lines):
+            if name == target:
+                total = cumulative
+                start = index
+                while start > 0 and lines[start - 1][2].startswith(' '):
+                    start -= 1
+                modules = [(c, s, n.strip()) for c, s, n in lines[start:index]]
+                break
+
+        if best is None or total < best[0]:
+            best = (total, modules)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('targets', nargs='*', default=TARGETS, help='modules to import')
+    parser.add_argument('--top', type=int, default=10, help='heaviest imports to list per target')
+    parser.add_argument('--runs', type=int, default=3, help='imports per target (fastest is kept)')
+    parser.add_argument('--json', metavar='PATH', help='write the totals to a JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='compare against an earlier --json file')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)
+
+    totals = {}
+    for target in args.targets:
+        total, modules = measure(target, args.runs)
+        totals[target] = total
+
+        line = f"{target:<32} {total / 1000:9.1f} ms"
+        if target in baseline:
+            change = (total - baseline[target]) / 1000
+            line += f"  ({change:+.1f} ms vs baseline)"
+        print(line)
+
+        # Heaviest third-party and stdlib packages pulled in by the target
+        heaviest = sorted((entry for entry in modules if '.' not in entry[2]),
+                          reverse=True)[:args.top]
+        for cumulative, _, name in heaviest:
+            print(f"    {name:<28} {cumulative / 1000:9.1f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output_file:
+            json.dump(totals, output_file, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
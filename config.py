@@ -6,6 +6,8 @@ class Config:
     UPLOAD_FOLDER = 'static/uploads'
     DOWNLOAD_FOLDER = 'downloads'
     MAX_CONTENT_LENGTH = 200 * 1024 * 1024  # 200MB max file size
+    # Let nginx/Apache send downloads (X-Sendfile) instead of Python
+    USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
     
     # Supported file extensions
     ALLOWED_EXTENSIONS = {
@@ -13,8 +15,76 @@ class Config:
         'mp3', 'wav', 'ogg', 'flac', 'm4a', 'aac', 'mp4', 'avi', 'mov'
     }
     
+    # Conversion log: JSON lines written by a background thread
+    LOG_FILE = os.environ.get('LOG_FILE', 'conversion.log')
+    LOG_STRUCTURED = os.environ.get('LOG_FORMAT', 'json').lower() == 'json'
+    LOG_ASYNC = True
+    
+    # Profiling: a share of conversions (or those requested with the
+    # PROFILE_HEADER set to ADMIN_SECRET) run under cProfile and tracemalloc
+    ADMIN_SECRET = os.environ.get('ADMIN_SECRET')
+    PROFILE_FOLDER = os.environ.get('PROFILE_FOLDER', 'profiles')
+    PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # 0.01 = 1% of conversions
+    PROFILE_HEADER = 'X-Profile'
+    PROFILE_LIFETIME = timedelta(days=7)
+    
+    # Bytes of an upload /api/file_info reads headers from
+    PROBE_SIZE = 1024 * 1024
+    
     # Cleanup settings
     TEMP_FILE_LIFETIME = timedelta(hours=1)
+    REAPER_INTERVAL = 30  # Seconds between background cleanup ticks
+    REAPER_BATCH_SIZE = 200  # Most files looked at per tick
+    
+    # Batch conversion limits
+    BATCH_MAX_FILES = 500
+    BATCH_MAX_CONTENT_LENGTH = 1024 * 1024 * 1024  # 1GB per batch request
+    
+    # Result cache: converted outputs keyed by input content and parameters
+    RESULT_CACHE_FOLDER = os.path.join(DOWNLOAD_FOLDER, '.cache')
+    RESULT_CACHE_MAX_SIZE = int(os.environ.get('RESULT_CACHE_MAX_SIZE', 1024 * 1024 * 1024))  # 1GB
+    
+    # Background job settings
+    JOB_FOLDER = 'jobs'
+    
+    # Conversion statistics shared by all worker processes
+    STATS_DB_PATH = os.environ.get('STATS_DB_PATH', os.path.join(JOB_FOLDER, 'stats.db'))
+    STATS_FLUSH_INTERVAL = 1.0  # Seconds between batched writes
+    
+    # Execution lanes: maximum concurrent conversions of each kind
+    EXECUTION_LANES = {
+        'ocr': 2,
+        'image': 8,
+        'audio': 4,
+        'video': 2,
+        'pdf': 4,
+        'document': 4,
+        'network': 4,
+        'default': 2
+    }
+    # Lanes whose work runs in the shared process pool instead of a thread
+    PROCESS_LANES = {'ocr', 'image', 'audio', 'video', 'pdf'}
+    PROCESS_POOL_SIZE = int(os.environ.get('PROCESS_POOL_SIZE', os.cpu_count() or 2))
+    # Large PDFs are split into page ranges extracted by this many processes
+    # each; smaller ones (fewer pages than the engine's minimum) serially
+    PDF_PARALLEL_WORKERS = int(os.environ.get('PDF_PARALLEL_WORKERS', os.cpu_count() or 1))
+    PDF_PARALLEL_MIN_PAGES = {'fitz': 300, 'pdfplumber': 20, 'layout': 300}
+    # Extracted PDF page text, kept by content hash for later conversions
+    # of the same document (0 turns the cache off)
+    PAGE_CACHE_PATH = os.environ.get('PAGE_CACHE_PATH', os.path.join(JOB_FOLDER, 'pages.db'))
+    PAGE_CACHE_MAX_SIZE = int(os.environ.get('PAGE_CACHE_MAX_SIZE', 256 * 1024 * 1024))  # 256MB
+    # Shortest expected job first within a lane; each second of waiting
+    # counts as this many seconds off a job's expected duration
+    EXECUTION_AGING = 1.0
+    
+    # Admission control: estimated cost of the conversions in flight in each
+    # app process; uploads over budget get 429 with a Retry-After
+    ADMISSION_BUDGETS = {
+        'cpu': PROCESS_POOL_SIZE * 300,  # Seconds of CPU work (5 minutes per worker)
+        'io': 600,  # Seconds of network-bound work (TTS, speech recognition)
+        'memory': int(os.environ.get('ADMISSION_MEMORY_BUDGET', 4 * 1024 * 1024 * 1024))  # 4GB
+    }
+    ADMISSION_MAX_RETRY_AFTER = 300
     
     # OCR language settings
     OCR_LANGUAGES = ['eng', 'spa', 'fra', 'deu', 'ita', 'por', 'rus', 'chi_sim', 'jpn', 'kor']
@@ -37,4 +107,5 @@ class Config:
     def init_app(app):
         # Create directories if they don't exist
         os.makedirs(Config.UPLOAD_FOLDER, exist_ok=True)
-        os.makedirs(Config.DOWNLOAD_FOLDER, exist_ok=True)
\ No newline at end of file
+        os.makedirs(Config.DOWNLOAD_FOLDER, exist_ok=True)
+        os.makedirs(Config.JOB_FOLDER, exist_ok=True)
\ No newline at end of file
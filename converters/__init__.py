@@ -1,12 +1,18 @@
-from .pdf_converter import PDFConverter
-from .audio_converter import AudioConverter
-from .image_converter import ImageConverter
-from .text_converter import TextConverter
+import importlib
 from .utils import FileValidator, ConversionLogger, TempFileManager
 
 __version__ = '1.0.0'
 __author__ = 'Multi-format Converter Team'
 
+# Converter classes are imported on first access (PEP 562), so importing
+# the package doesn't pull in fitz, cv2, speech_recognition, pyttsx3, etc.
+_LAZY_CONVERTERS = {
+    'PDFConverter': '.pdf_converter',
+    'AudioConverter': '.audio_converter',
+    'ImageConverter': '.image_converter',
+    'TextConverter': '.text_converter'
+}
+
 __all__ = [
     'PDFConverter',
     'AudioConverter', 
@@ -15,4 +21,18 @@ __all__ = [
     'FileValidator',
     'ConversionLogger',
     'TempFileManager'
-]
\ No newline at end of file
+]
+
+
+def __getattr__(name):
+    module_name = _LAZY_CONVERTERS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_CONVERTERS))
@@ -0,0 +1,201 @@
+import math
+import time
+import wave
+import threading
+from .conversions import IO_HEAVY
+
+KB = 1024
+MB = 1024 * 1024
+
+# Per input type: the unit its work scales with, CPU seconds per unit, and
+# working memory per unit plus a fixed overhead. Rough single-core figures
+# from benchmarks/converter_methods.py; they only need to rank jobs and
+# keep the total in flight in check.
+COST_MODEL = {
+    'pdf': ('pages', 0.4, 4 * MB, 50 * MB),
+    'document': ('megabytes', 2.0, 60 * MB, 30 * MB),
+    'image': ('megapixels', 0.3, 12 * MB, 30 * MB),
+    'audio': ('seconds', 0.02, 400 * KB, 30 * MB),
+    'video': ('seconds', 0.05, 0, 60 * MB)
+}
+DEFAULT_COST = ('megabytes', 1.0, 20 * MB, 30 * MB)
+
+
+def measure(input_type, path, size):
+    """Count the work units of a file from its header, falling back to its size"""
+    unit = COST_MODEL.get(input_type, DEFAULT_COST)[0]
+    try:
+        if unit == 'pages':
+            import fitz
+            with fitz.open(path) as document:
+                return max(document.page_count, 1)
+        if unit == 'megapixels':
+            from PIL import Image
+            with Image.open(path) as image:
+                width, height = image.size
+            return width * height / 1e6
+        if unit == 'seconds' and path.lower().endswith('.wav'):
+            with wave.open(path, 'rb') as audio:
+                return audio.getnframes() / audio.getframerate()
+    except Exception:
+        pass
+
+    # Typical densities: 50KB per PDF page, 300KB per compressed
+    # megapixel, 128kbps audio, 8Mbps video
+    if unit == 'pages':
+        return max(size / (50 * KB), 1)
+    if unit == 'megapixels':
+        return size / (300 * KB)
+    if unit == 'seconds':
+        return size / (1 * MB) if input_type == 'video' else size / (16 * KB)
+    return size / MB
+
+
+class AdmissionRejected(Exception):
+    """Raised when a conversion does not fit the budgets right now"""
+
+    def __init__(self, resource, retry_after):
+        super().__init__(f"Server is busy ({resource} budget exhausted), "
+                         f"retry in {retry_after} seconds")
+        self.resource = resource
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """Budget held by one admitted conversion until it finishes"""
+
+    def __init__(self, controller, costs, expected_end):
+        self.controller = controller
+        self.costs = costs
+        self.expected_end = expected_end
+        self.released = False
+
+    def release(self):
+        self.controller.release(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class AdmissionController:
+    """Admit conversions only while their estimated cost fits the budgets
+
+    Every conversion gets a cost estimate per resource: ``cpu`` and ``io``
+    are seconds of work (CPU-bound vs. network-bound), ``memory`` is bytes
+    of working memory. The estimate is held from admission until the job
+    finishes. A job that would push a resource over its budget is
+    rejected with a Retry-After computed from when enough in-flight work
+    is expected to finish. ``rates`` say how many seconds of work per
+    second each resource gets through (its number of workers). When
+    nothing is in flight a job is always admitted, so a job larger than a
+    budget still runs on its own. Budgets are per app process.
+    """
+
+    def __init__(self, budgets, rates=None, max_retry_after=300):
+        self.budgets = dict(budgets)
+        self.rates = dict(rates or {})
+        self.max_retry_after = max_retry_after
+
+        self.in_flight = {resource: 0 for resource in self.budgets}
+        self.tickets = set()
+        self.rejected = {}
+        self.lock = threading.Lock()
+
+    def estimate(self, spec, input_type, units):
+        """Estimate the resources a conversion of ``units`` (see measure) will use"""
+        _, seconds_per_unit, memory_per_unit, base_memory = COST_MODEL.get(input_type,
+                                                                           DEFAULT_COST)
+
+        # Pipelines do the work of every step; network-bound steps wait
+        # on remote services rather than the CPU
+        steps = getattr(spec, 'steps', (spec,))
+        costs = {'cpu': 0.0, 'io': 0.0}
+        for step in steps:
+            resource = 'io' if step.cost == IO_HEAVY else 'cpu'
+            costs[resource] += units * seconds_per_unit
+        costs['memory'] = base_memory + units * memory_per_unit
+        return costs
+
+    def check(self):
+        """Reject early, before reading an upload, if a budget is already used up"""
+        with self.lock:
+            if not self.tickets:
+                return
+            now = time.time()
+            for resource, budget in self.budgets.items():
+                if self.in_flight.get(resource, 0) >= budget:
+                    self._reject(resource, self._retry_after(resource, 0, now))
+
+    def admit(self, costs):
+        """Reserve budget for one conversion and return its Ticket"""
+        return self.admit_all([costs])[0]
+
+    def admit_all(self, costs_list):
+        """Reserve budget for several conversions at once, or for none of them
+
+        Raises AdmissionRejected if the total does not fit.
+        """
+        total = {}
+        for costs in costs_list:
+            for resource, amount in costs.items():
+                total[resource] = total.get(resource, 0) + amount
+
+        with self.lock:
+            now = time.time()
+            if self.tickets:
+                for resource, budget in self.budgets.items():
+                    excess = self.in_flight.get(resource, 0) + total.get(resource, 0) - budget
+                    if excess > 0:
+                        self._reject(resource, self._retry_after(resource, excess, now))
+
+            tickets = []
+            for costs in costs_list:
+                for resource, amount in costs.items():
+                    self.in_flight[resource] = self.in_flight.get(resource, 0) + amount
+                ticket = Ticket(self, costs, now + self._expected_wait())
+                self.tickets.add(ticket)
+                tickets.append(ticket)
+            return tickets
+
+    def release(self, ticket):
+        with self.lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            self.tickets.discard(ticket)
+            for resource, amount in ticket.costs.items():
+                self.in_flight[resource] = max(self.in_flight.get(resource, 0) - amount, 0)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'in_flight': dict(self.in_flight),
+                'budgets': dict(self.budgets),
+                'admitted': len(self.tickets),
+                'rejected': dict(self.rejected)
+            }
+
+    def _expected_wait(self):
+        # Seconds until the work now in flight (including the new job) is
+        # done, if each resource drains at its rate
+        return max([self.in_flight.get(resource, 0) / rate
+                    for resource, rate in self.rates.items() if rate > 0] or [0])
+
+    def _retry_after(self, resource, excess, now):
+        # Free enough of the resource by retiring tickets in the order
+        # they are expected to finish
+        freed = 0
+        wait = self.max_retry_after
+        for ticket in sorted(self.tickets, key=lambda ticket: ticket.expected_end):
+            freed += ticket.costs.get(resource, 0)
+            if freed >= excess and freed > 0:
+                wait = ticket.expected_end - now
+                break
+        return min(max(math.ceil(wait), 1), self.max_retry_after)
+
+    def _reject(self, resource, retry_after):
+        self.rejected[resource] = self.rejected.get(resource, 0) + 1
+        raise AdmissionRejected(resource, retry_after)
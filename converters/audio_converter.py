@@ -1,66 +1,85 @@
 import os
-import tempfile
+import io
 import speech_recognition as sr
 from pydub import AudioSegment
 from pydub.utils import which
 import ffmpeg
 import shutil
+import threading
 
 class AudioConverter:
-    def __init__(self):
-        self.recognizer = sr.Recognizer()
+    def __init__(self, ffmpeg_available=None):
+        self._local = threading.local()
         
-        # Check if ffmpeg is available
-        self.ffmpeg_available = which("ffmpeg") is not None
+        # Check if ffmpeg is available (the converter registry passes in its cached probe)
+        if ffmpeg_available is None:
+            ffmpeg_available = which("ffmpeg") is not None
+        self.ffmpeg_available = ffmpeg_available
         if not self.ffmpeg_available:
             print("Warning: ffmpeg not found. Some audio conversions may not work.")
     
+    @property
+    def recognizer(self):
+        """Speech recognizer for the calling thread
+        
+        Recognizers keep per-call state (e.g. the ambient noise threshold),
+        so a shared converter gives each thread its own.
+        """
+        recognizer = getattr(self._local, 'recognizer', None)
+        if recognizer is None:
+            recognizer = self._local.recognizer = sr.Recognizer()
+        return recognizer
+    
+    # The file methods below accept either a path or an AudioSegment, so
+    # that a pipeline can hand over the audio produced by its previous step
+    def load(self, audio_path):
+        """Decode an audio file for in-memory processing"""
+        return AudioSegment.from_file(audio_path)
+    
+    def _load(self, source):
+        return source if isinstance(source, AudioSegment) else AudioSegment.from_file(source)
+    
     def audio_to_text(self, audio_path, output_path):
         """Convert audio file to text using speech recognition"""
         try:
-            # Convert to WAV if needed for speech recognition
-            audio = AudioSegment.from_file(audio_path)
-            
-            # Create temporary WAV file
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_wav:
-                temp_wav_path = temp_wav.name
-            
-            # Export as WAV (speech_recognition works best with WAV)
-            audio.export(temp_wav_path, format="wav")
-            
-            # Perform speech recognition
-            with sr.AudioFile(temp_wav_path) as source:
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                audio_data = self.recognizer.record(source)
-            
-            # Recognize speech using Google's service
-            try:
-                text = self.recognizer.recognize_google(audio_data)
-            except sr.UnknownValueError:
-                text = "Could not understand the audio content."
-            except sr.RequestError as e:
-                # Fallback to offline recognition if available
-                try:
-                    text = self.recognizer.recognize_sphinx(audio_data)
-                except:
-                    text = f"Speech recognition service error: {str(e)}"
+            text = self.transcribe(self._load(audio_path))
             
             # Save text to file
             with open(output_path, 'w', encoding='utf-8') as txt_file:
                 txt_file.write(text)
             
-            # Clean up temporary file
-            os.unlink(temp_wav_path)
-            
             return output_path
             
         except Exception as e:
-            # Clean up temporary file if it exists
-            if 'temp_wav_path' in locals() and os.path.exists(temp_wav_path):
-                os.unlink(temp_wav_path)
             raise Exception(f"Audio to text conversion failed: {str(e)}")
     
+    def transcribe(self, audio):
+        """Recognize the speech in an AudioSegment and return the text"""
+        # Export as WAV (speech_recognition works best with WAV); the
+        # recognizer reads file objects, so the PCM never touches disk
+        wav_file = io.BytesIO()
+        audio.export(wav_file, format="wav")
+        wav_file.seek(0)
+        
+        # Perform speech recognition
+        with sr.AudioFile(wav_file) as source:
+            # Adjust for ambient noise
+            self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
+            audio_data = self.recognizer.record(source)
+        
+        # Recognize speech using Google's service
+        try:
+            text = self.recognizer.recognize_google(audio_data)
+        except sr.UnknownValueError:
+            text = "Could not understand the audio content."
+        except sr.RequestError as e:
+            # Fallback to offline recognition if available
+            try:
+                text = self.recognizer.recognize_sphinx(audio_data)
+            except:
+                text = f"Speech recognition service error: {str(e)}"
+        return text
+    
     def convert_audio_format(self, input_path, output_path, target_format=None):
         """Convert audio file to different format"""
         try:
@@ -68,7 +87,7 @@ class AudioConverter:
                 target_format = os.path.splitext(output_path)[1][1:]  # Get extension without dot
             
             # Load audio file
-            audio = AudioSegment.from_file(input_path)
+            audio = self._load(input_path)
             
             # Export in target format
             audio.export(output_path, format=target_format)
@@ -82,7 +101,7 @@ class AudioConverter:
         """Compress audio file by reducing bitrate"""
         try:
             # Load audio file
-            audio = AudioSegment.from_file(input_path)
+            audio = self._load(input_path)
             
             # Export with lower bitrate
             audio.export(output_path, format="mp3", bitrate=bitrate)
@@ -137,63 +156,53 @@ class AudioConverter:
     def trim_audio(self, input_path, output_path, start_time=0, end_time=None):
         """Trim audio file to specified duration"""
         try:
-            # Load audio file
-            audio = AudioSegment.from_file(input_path)
-            
-            # Convert time to milliseconds
-            start_ms = start_time * 1000
-            end_ms = end_time * 1000 if end_time else len(audio)
-            
-            # Trim audio
-            trimmed_audio = audio[start_ms:end_ms]
-            
             # Export trimmed audio
-            trimmed_audio.export(output_path, format="mp3")
+            self.trim(self._load(input_path), start_time, end_time).export(output_path, format="mp3")
             
             return output_path
             
         except Exception as e:
             raise Exception(f"Audio trimming failed: {str(e)}")
     
+    def trim(self, audio, start_time=0, end_time=None):
+        """Cut an AudioSegment to the given start and end (in seconds)"""
+        # Convert time to milliseconds
+        start_ms = start_time * 1000
+        end_ms = end_time * 1000 if end_time else len(audio)
+        return audio[start_ms:end_ms]
+    
     def change_audio_speed(self, input_path, output_path, speed_factor=1.0):
         """Change audio playback speed"""
         try:
-            # Load audio file
-            audio = AudioSegment.from_file(input_path)
-            
-            # Change speed (and pitch)
-            if speed_factor > 1.0:
-                # Speed up
-                audio = audio.speedup(playback_speed=speed_factor)
-            elif speed_factor < 1.0:
-                # Slow down
-                audio = audio.speedup(playback_speed=speed_factor)
-            
             # Export modified audio
-            audio.export(output_path, format="mp3")
+            self.change_speed(self._load(input_path), speed_factor).export(output_path, format="mp3")
             
             return output_path
             
         except Exception as e:
             raise Exception(f"Audio speed change failed: {str(e)}")
     
+    def change_speed(self, audio, speed_factor=1.0):
+        """Change the playback speed (and pitch) of an AudioSegment"""
+        if speed_factor != 1.0:
+            audio = audio.speedup(playback_speed=speed_factor)
+        return audio
+    
     def normalize_audio(self, input_path, output_path):
         """Normalize audio volume levels"""
         try:
-            # Load audio file
-            audio = AudioSegment.from_file(input_path)
-            
-            # Normalize audio
-            normalized_audio = audio.normalize()
-            
             # Export normalized audio
-            normalized_audio.export(output_path, format="mp3")
+            self.normalize(self._load(input_path)).export(output_path, format="mp3")
             
             return output_path
             
         except Exception as e:
             raise Exception(f"Audio normalization failed: {str(e)}")
     
+    def normalize(self, audio):
+        """Normalize the volume of an AudioSegment"""
+        return audio.normalize()
+    
     def get_audio_info(self, audio_path):
         """Get audio file information"""
         try:
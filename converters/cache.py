@@ -0,0 +1,129 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from .storage import SizeBudget
+
+
+class ResultCache:
+    """Content-addressed store of conversion outputs with LRU eviction
+
+    Entries live in ``cache_dir`` (inside the downloads folder) under a
+    two-character shard of their key. Each entry is a hard link to the
+    output it was created from, so caching a result costs no extra disk
+    writes, and a hit is handed out as another hard link. The entry's
+    modification time doubles as its last-use time for LRU eviction, which
+    keeps the cache consistent across worker processes without an index.
+    """
+
+    def __init__(self, cache_dir, max_size_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_size = max_size_bytes
+        self.budget = SizeBudget(max_size_bytes, self.evict)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(content_hash, conversion_type, params=None):
+        """Build the cache key for an input hash, conversion and its parameters"""
+        payload = json.dumps([content_hash, conversion_type, params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key, base_path):
+        """Materialize a cached output next to ``base_path``
+
+        ``base_path`` is the output path without its conversion suffix
+        (e.g. ``downloads/<uuid>_photo``). Returns the new output path, or
+        None on a miss.
+        """
+        shard_dir = self._shard_dir(key)
+        try:
+            # Skip the temporary links of a put in progress
+            names = [name for name in os.listdir(shard_dir)
+                     if name.startswith(key) and not name.endswith('.tmp')]
+        except FileNotFoundError:
+            return None
+
+        for name in names:
+            entry_path = os.path.join(shard_dir, name)
+            output_path = base_path + name[len(key):]
+            try:
+                self._link(entry_path, output_path)
+                os.utime(entry_path)  # Mark as recently used
+                return output_path
+            except OSError:
+                continue
+
+        return None
+
+    def put(self, key, base_path, output_path):
+        """Store a freshly converted output under ``key``"""
+        if not output_path.startswith(base_path):
+            return False
+
+        suffix = output_path[len(base_path):]
+        shard_dir = self._shard_dir(key)
+        entry_path = os.path.join(shard_dir, key + suffix)
+        temp_path = f"{entry_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            os.makedirs(shard_dir, exist_ok=True)
+            self._link(output_path, temp_path)
+            os.replace(temp_path, entry_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return False
+
+        self.budget.add(os.path.getsize(entry_path))
+        return True
+
+    def get_size(self):
+        """Get the total size of all cache entries in bytes"""
+        return sum(size for _, _, size in self._scan())
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits its budget"""
+        entries = sorted(self._scan())
+        total_size = sum(size for _, _, size in entries)
+        removed = 0
+
+        for _, entry_path, size in entries:
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(entry_path)
+                total_size -= size
+                removed += 1
+            except OSError:
+                continue
+
+        self.budget.measured(total_size)
+        return removed
+
+    def _scan(self):
+        entries = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def _shard_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2])
+
+    @staticmethod
+    def _link(source, destination):
+        try:
+            os.link(source, destination)
+        except OSError:
+            # Filesystems without hard links fall back to a copy
+            shutil.copy2(source, destination)
@@ -0,0 +1,410 @@
+import io
+import functools
+
+# Cost classes, used to route work: cheap work runs inline, CPU-heavy work
+# in worker processes, I/O-heavy work (network services) on threads
+CHEAP = 'cheap'
+CPU_HEAVY = 'cpu'
+IO_HEAVY = 'io'
+COST_RANK = {CHEAP: 0, IO_HEAVY: 1, CPU_HEAVY: 2}
+
+# What a conversion step reads and hands on: the uploaded file itself, or
+# an in-memory value (str, PIL image or pydub AudioSegment)
+FILE = 'file'
+TEXT = 'text'
+IMAGE = 'image'
+AUDIO = 'audio'
+
+
+def page_range(raw):
+    """Parse a 1-based page selection such as ``3-7``, ``1,4,10-12`` or ``20-``
+
+    Returns it in canonical form (sorted, merged, no spaces), so equal
+    selections share cache entries. Raises ValueError if it is malformed.
+    """
+    ranges = []
+    for part in str(raw).replace(' ', '').split(','):
+        if not part:
+            continue
+        first, dash, last = part.partition('-')
+        start = int(first)
+        stop = (int(last) if last else None) if dash else start
+        if start < 1 or (stop is not None and stop < start):
+            raise ValueError(f"Invalid page range: {part}")
+        ranges.append((start, stop))
+    if not ranges or len(ranges) > 100:
+        raise ValueError("Expected 1 to 100 page ranges")
+
+    merged = []
+    for start, stop in sorted(ranges, key=lambda item: item[0]):
+        if merged and (merged[-1][1] is None or start <= merged[-1][1] + 1):
+            last_stop = merged[-1][1]
+            merged[-1] = (merged[-1][0], None if None in (last_stop, stop) else max(last_stop, stop))
+        else:
+            merged.append((start, stop))
+    return ','.join(str(start) if stop == start else f"{start}-{'' if stop is None else stop}"
+                    for start, stop in merged)
+
+
+def select_pages(page_count, pages=None, max_pages=None):
+    """0-based indexes of the pages a ``pages`` selection and ``max_pages`` pick
+
+    Pages past the end of the document are ignored; raises ValueError if
+    the selection holds none of its pages.
+    """
+    if pages:
+        indexes = []
+        for part in page_range(pages).split(','):
+            first, dash, last = part.partition('-')
+            stop = (int(last) if last else page_count) if dash else int(first)
+            indexes.extend(range(int(first) - 1, min(stop, page_count)))
+        if not indexes:
+            raise ValueError(f"Pages {pages} are not in the document ({page_count} pages)")
+    else:
+        indexes = range(page_count)
+    return list(indexes[:max_pages] if max_pages else indexes)
+
+
+class Param:
+    """A typed conversion option read from the form or API"""
+
+    TRUE_VALUES = ('true', '1', 'yes', 'on')
+    FALSE_VALUES = ('false', '0', 'no', 'off')
+
+    def __init__(self, name, type=str, default=None, choices=None, minimum=None, maximum=None,
+                 argument=None):
+        self.name = name
+        self.type = type
+        self.default = default
+        self.choices = choices
+        self.minimum = minimum
+        self.maximum = maximum
+        self.argument = argument or name  # Keyword of the converter method
+
+    def parse(self, raw):
+        """Convert a raw form value, falling back to the default when empty"""
+        if raw is None or (isinstance(raw, str) and not raw.strip()):
+            return self.default
+
+        try:
+            if self.type is bool:
+                if isinstance(raw, bool):
+                    value = raw
+                elif str(raw).strip().lower() in self.TRUE_VALUES:
+                    value = True
+                elif str(raw).strip().lower() in self.FALSE_VALUES:
+                    value = False
+                else:
+                    raise ValueError
+            elif self.type is str:
+                value = str(raw).strip().lower()
+            else:
+                value = self.type(raw)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid value for {self.name}: {raw!r}")
+
+        if self.choices is not None and value not in self.choices:
+            choices = ', '.join(str(choice) for choice in self.choices)
+            raise ValueError(f"Invalid value for {self.name}: {raw!r} (expected one of {choices})")
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{self.name} must be at least {self.minimum}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"{self.name} must be at most {self.maximum}")
+        return value
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'type': self.type.__name__,
+            'default': self.default,
+            'choices': list(self.choices) if self.choices is not None else None,
+            'minimum': self.minimum,
+            'maximum': self.maximum
+        }
+
+
+class ConversionSpec:
+    """How one conversion type is validated, run and scheduled"""
+
+    def __init__(self, name, input_type, converter, method, output_suffix, params=(),
+                 cost=CHEAP, lane='default', arguments=None, consumes=FILE, produces=None,
+                 transform=None):
+        self.name = name
+        self.input_type = input_type
+        self.converter = converter  # Converter registry key
+        self.method = method
+        self.output_suffix = output_suffix  # May reference parameters, e.g. '.{target_format}'
+        self.params = tuple(params)
+        self.cost = cost
+        self.lane = lane
+        self.arguments = arguments  # Optional params -> method keyword arguments mapping
+        # Pipeline support: the value this step reads and the one it produces
+        # (None if it only writes files). ``transform`` names the in-memory
+        # converter method; steps without one (e.g. those that only change
+        # the encoding: format, quality, bitrate) can only be the last step.
+        self.consumes = consumes
+        self.produces = produces
+        self.transform = transform
+
+    def parse_params(self, options):
+        """Get the typed parameters of this conversion from raw options
+
+        Unknown options are ignored, so the result doubles as the canonical
+        parameter set for cache keys. Raises ValueError on invalid values.
+        """
+        options = options or {}
+        return {param.name: param.parse(options.get(param.name)) for param in self.params}
+
+    def output_name(self, base_name, params):
+        return base_name + self.output_suffix.format(**params)
+
+    def run(self, converters, input_path, output_path, params):
+        """Call the converter method and return the output path"""
+        converter = converters.get(self.converter)
+        return getattr(converter, self.method)(input_path, output_path, **self._kwargs(params))
+
+    def apply(self, converters, value, params):
+        """Run this step on the in-memory result of the previous step"""
+        converter = converters.get(self.converter)
+        return getattr(converter, self.transform)(value, **self._kwargs(params))
+
+    def _kwargs(self, params):
+        if self.arguments is not None:
+            return self.arguments(params)
+        return {param.argument: params[param.name] for param in self.params}
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'input_type': self.input_type,
+            'cost': self.cost,
+            'consumes': self.consumes,
+            'produces': self.produces,
+            'params': [param.to_dict() for param in self.params]
+        }
+
+
+class Pipeline:
+    """Conversions run in order as one job, e.g. ``pdf_to_txt|txt_to_docx``
+
+    Each step hands its result to the next in memory (text, a PIL image or
+    decoded audio), so the input is read once and only the last step
+    writes a file. Pipelines have the same interface as ConversionSpec.
+    """
+
+    SEPARATOR = '|'
+    MAX_STEPS = 5
+
+    def __init__(self, steps):
+        self.steps = tuple(steps)
+        self.name = self.SEPARATOR.join(spec.name for spec in self.steps)
+        self.input_type = self.steps[0].input_type
+
+        # Scheduled like its most expensive step
+        heaviest = max(self.steps, key=lambda spec: COST_RANK[spec.cost])
+        self.cost = heaviest.cost
+        self.lane = heaviest.lane
+
+    @classmethod
+    def parse(cls, expression):
+        """Build a pipeline from ``step|step|...``, raising ValueError if invalid"""
+        names = [name.strip() for name in expression.split(cls.SEPARATOR)]
+        if len(names) < 2:
+            raise ValueError("A pipeline needs at least two steps")
+        if len(names) > cls.MAX_STEPS:
+            raise ValueError(f"A pipeline can have at most {cls.MAX_STEPS} steps")
+
+        steps = []
+        for name in names:
+            spec = CONVERSIONS.get(name)
+            if spec is None:
+                raise ValueError(f"Unknown conversion step: {name!r}")
+            if steps:
+                previous = steps[-1]
+                if previous.transform is None:
+                    raise ValueError(f"{previous.name} can only be the last step")
+                if previous.produces != spec.consumes:
+                    raise ValueError(f"{spec.name} reads {spec.consumes}, but {previous.name} "
+                                     f"produces {previous.produces}")
+            steps.append(spec)
+        return cls(steps)
+
+    def parse_params(self, options):
+        """Get the typed parameters of every step
+
+        Steps read the shared options, and ``<step>.<option>`` sets an option
+        for one step only. Options may instead hold a ``steps`` list with one
+        dict per step (the parsed form, so parsing is idempotent).
+        """
+        options = options or {}
+        step_options = options.get('steps')
+        if isinstance(step_options, (list, tuple)):
+            if len(step_options) != len(self.steps):
+                raise ValueError(f"Expected options for {len(self.steps)} steps")
+            return {'steps': [spec.parse_params(values)
+                              for spec, values in zip(self.steps, step_options)]}
+
+        steps = []
+        for spec in self.steps:
+            prefix = spec.name + '.'
+            values = dict(options)
+            values.update((key[len(prefix):], value) for key, value in options.items()
+                          if key.startswith(prefix))
+            steps.append(spec.parse_params(values))
+        return {'steps': steps}
+
+    def output_name(self, base_name, params):
+        return self.steps[-1].output_name(base_name, params['steps'][-1])
+
+    def run(self, converters, input_path, output_path, params):
+        """Run every step and return the output path of the last one"""
+        first, last = self.steps[0], self.steps[-1]
+        value = input_path
+        if first.consumes != FILE:
+            value = converters.get(first.converter).load(input_path)
+
+        for spec, step_params in zip(self.steps[:-1], params['steps']):
+            value = spec.apply(converters, value, step_params)
+
+        # File-based converter methods read text from a stream
+        if last.consumes == TEXT:
+            value = io.StringIO(value)
+        return last.run(converters, value, output_path, params['steps'][-1])
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'input_type': self.input_type,
+            'cost': self.cost,
+            'steps': [spec.name for spec in self.steps]
+        }
+
+
+# Every conversion the app offers. Validation, dispatch, result caching and
+# scheduling all read this one table.
+IMAGE_FORMATS = ('jpg', 'png', 'gif', 'bmp', 'tiff')
+AUDIO_FORMATS = ('mp3', 'wav', 'ogg', 'flac', 'aac')
+PDF_ENGINE = Param('pdf_engine', default='fitz', choices=('fitz', 'pdfplumber'),
+                   argument='engine')
+# pdf_to_docx can also keep headings and tables from PyMuPDF's text blocks
+PDF_DOCX_ENGINE = Param('pdf_engine', default='layout', choices=('layout', 'fitz', 'pdfplumber'),
+                        argument='engine')
+PDF_PAGES = [Param('pages', type=page_range), Param('max_pages', type=int, minimum=1)]
+
+CONVERSIONS = {spec.name: spec for spec in [
+    # PDF
+    ConversionSpec('pdf_to_docx', 'pdf', 'pdf', 'pdf_to_docx', '.docx',
+                   params=[PDF_DOCX_ENGINE] + PDF_PAGES,
+                   cost=CPU_HEAVY, lane='pdf'),
+    ConversionSpec('pdf_to_txt', 'pdf', 'pdf', 'pdf_to_txt', '.txt',
+                   params=[PDF_ENGINE] + PDF_PAGES,
+                   produces=TEXT, transform='extract_text',
+                   cost=CPU_HEAVY, lane='pdf'),
+    ConversionSpec('pdf_to_audio', 'pdf', 'pdf', 'pdf_to_audio', '.mp3',
+                   params=[PDF_ENGINE] + PDF_PAGES,
+                   cost=IO_HEAVY, lane='network'),
+    ConversionSpec('pdf_to_images', 'pdf', 'pdf', 'pdf_to_images', '_images.zip',
+                   params=PDF_PAGES,
+                   cost=CPU_HEAVY, lane='pdf'),
+
+    # Documents
+    ConversionSpec('text_to_audio', 'document', 'document', 'text_to_audio', '.mp3',
+                   params=[Param('tts_engine', default='gtts', choices=('gtts', 'pyttsx3'),
+                                 argument='engine')],
+                   consumes=TEXT,
+                   cost=IO_HEAVY, lane='network'),
+    ConversionSpec('txt_to_docx', 'document', 'document', 'txt_to_docx', '.docx',
+                   consumes=TEXT,
+                   lane='document'),
+    ConversionSpec('docx_to_txt', 'document', 'document', 'docx_to_txt', '.txt',
+                   produces=TEXT, transform='extract_docx_text',
+                   lane='document'),
+
+    # Images
+    ConversionSpec('image_to_pdf', 'image', 'image', 'image_to_pdf', '.pdf',
+                   consumes=IMAGE,
+                   cost=CPU_HEAVY, lane='image'),
+    ConversionSpec('image_to_text', 'image', 'image', 'image_to_text', '.txt',
+                   consumes=IMAGE, produces=TEXT, transform='extract_text',
+                   cost=CPU_HEAVY, lane='ocr'),
+    ConversionSpec('image_resize', 'image', 'image', 'resize_image', '_resized.jpg',
+                   params=[Param('width', int, 800, minimum=1, maximum=10000),
+                           Param('height', int, 600, minimum=1, maximum=10000),
+                           Param('maintain_aspect', bool, True)],
+                   arguments=lambda params: {'size': (params['width'], params['height']),
+                                             'maintain_aspect': params['maintain_aspect']},
+                   consumes=IMAGE, produces=IMAGE, transform='resize',
+                   cost=CPU_HEAVY, lane='image'),
+    ConversionSpec('image_format', 'image', 'image', 'convert_image_format', '.{target_format}',
+                   params=[Param('target_format', default='jpg', choices=IMAGE_FORMATS)],
+                   consumes=IMAGE, produces=IMAGE,
+                   cost=CPU_HEAVY, lane='image'),
+    ConversionSpec('image_compress', 'image', 'image', 'compress_image', '_compressed.jpg',
+                   params=[Param('quality', int, 85, minimum=1, maximum=100)],
+                   consumes=IMAGE, produces=IMAGE,
+                   cost=CPU_HEAVY, lane='image'),
+    ConversionSpec('image_filter', 'image', 'image', 'apply_image_filter', '_filtered.jpg',
+                   params=[Param('filter_type', default='enhance',
+                                 choices=('enhance', 'blur', 'sharpen', 'smooth', 'grayscale'))],
+                   consumes=IMAGE, produces=IMAGE, transform='apply_filter',
+                   cost=CPU_HEAVY, lane='image'),
+    ConversionSpec('image_rotate', 'image', 'image', 'rotate_image', '_rotated.jpg',
+                   params=[Param('rotate_angle', int, 90, minimum=-360, maximum=360,
+                                 argument='angle')],
+                   consumes=IMAGE, produces=IMAGE, transform='rotate',
+                   cost=CPU_HEAVY, lane='image'),
+
+    # Audio
+    ConversionSpec('audio_to_text', 'audio', 'audio', 'audio_to_text', '.txt',
+                   consumes=AUDIO, produces=TEXT, transform='transcribe',
+                   cost=IO_HEAVY, lane='audio'),
+    ConversionSpec('audio_format', 'audio', 'audio', 'convert_audio_format', '.{target_format}',
+                   params=[Param('target_format', default='mp3', choices=AUDIO_FORMATS)],
+                   consumes=AUDIO, produces=AUDIO,
+                   cost=CPU_HEAVY, lane='audio'),
+    ConversionSpec('audio_compress', 'audio', 'audio', 'compress_audio', '_compressed.mp3',
+                   params=[Param('bitrate', default='64k',
+                                 choices=('32k', '64k', '128k', '192k', '256k', '320k'))],
+                   consumes=AUDIO, produces=AUDIO,
+                   cost=CPU_HEAVY, lane='audio'),
+    ConversionSpec('audio_normalize', 'audio', 'audio', 'normalize_audio', '_normalized.mp3',
+                   consumes=AUDIO, produces=AUDIO, transform='normalize',
+                   cost=CPU_HEAVY, lane='audio'),
+    ConversionSpec('audio_trim', 'audio', 'audio', 'trim_audio', '_trimmed.mp3',
+                   params=[Param('start_time', float, 0.0, minimum=0),
+                           Param('end_time', float, None, minimum=0)],
+                   consumes=AUDIO, produces=AUDIO, transform='trim',
+                   cost=CPU_HEAVY, lane='audio'),
+    ConversionSpec('audio_speed', 'audio', 'audio', 'change_audio_speed', '_speed.mp3',
+                   params=[Param('speed_factor', float, 1.0, minimum=0.25, maximum=4.0)],
+                   consumes=AUDIO, produces=AUDIO, transform='change_speed',
+                   cost=CPU_HEAVY, lane='audio'),
+
+    # Video
+    ConversionSpec('video_to_audio', 'video', 'video', 'extract_audio_from_video',
+                   '.{audio_format}',
+                   params=[Param('audio_format', default='mp3', choices=AUDIO_FORMATS)],
+                   arguments=lambda params: {},
+                   cost=CPU_HEAVY, lane='video')
+]}
+
+
+def get_conversion(conversion_type):
+    """Get the spec (or pipeline) for a conversion type, or None if it isn't offered"""
+    spec = CONVERSIONS.get(conversion_type)
+    if spec is None and conversion_type and Pipeline.SEPARATOR in conversion_type:
+        try:
+            spec = _get_pipeline(conversion_type)
+        except ValueError:
+            return None
+    return spec
+
+
+@functools.lru_cache(maxsize=256)
+def _get_pipeline(expression):
+    return Pipeline.parse(expression)
+
+
+def get_conversions_for(input_type):
+    """Get the names of the conversions offered for an input type"""
+    return [spec.name for spec in CONVERSIONS.values() if spec.input_type == input_type]
@@ -0,0 +1,119 @@
+import os
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+DOCUMENT_PART = 'word/document.xml'
+
+# Characters XML 1.0 does not allow, even escaped
+INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+
+
+def default_template():
+    """Path of the blank document python-docx starts from"""
+    import docx
+    return os.path.join(os.path.dirname(docx.__file__), 'templates', 'default.docx')
+
+
+class DocxWriter:
+    """Write a DOCX file one paragraph or table at a time
+
+    python-docx keeps the whole document tree in memory until it saves.
+    This writer copies every part of a template (styles, numbering,
+    settings) and streams the body XML straight into the deflated zip
+    entry, so memory stays flat however long the document gets. It only
+    writes what the converters need: headings, plain paragraphs and
+    simple tables, using the template's built-in styles (``Heading1``,
+    ``TableGrid``, ...).
+    """
+
+    def __init__(self, output_path, template=None, buffer_size=64 * 1024):
+        self.output_path = output_path
+        self.buffer_size = buffer_size
+        self.pending = []
+        self.pending_size = 0
+
+        with zipfile.ZipFile(template or default_template()) as source:
+            document = source.read(DOCUMENT_PART).decode('utf-8')
+            body_start = document.index('<w:body>') + len('<w:body>')
+            section = document.find('<w:sectPr', body_start)
+            self._header = document[:body_start]
+            self._footer = document[section if section >= 0 else document.index('</w:body>'):]
+
+            self._zip = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+            try:
+                for item in source.infolist():
+                    if item.filename != DOCUMENT_PART:
+                        self._zip.writestr(item, source.read(item.filename))
+                self._body = self._zip.open(DOCUMENT_PART, 'w', force_zip64=True)
+            except Exception:
+                self._zip.close()
+                raise
+        self._write(self._header)
+
+    def add_heading(self, text, level=1):
+        """Add a heading; level 0 is the document title"""
+        self.add_paragraph(text, 'Title' if level == 0 else f'Heading{min(max(level, 1), 9)}')
+
+    def add_paragraph(self, text, style=None):
+        self._write(self._paragraph(text, style))
+
+    def add_table(self, rows, style='TableGrid'):
+        """Add a table of text cells; short rows are padded to the widest one"""
+        columns = max((len(row) for row in rows), default=0)
+        if not columns:
+            return
+
+        parts = [f'<w:tbl><w:tblPr><w:tblStyle w:val="{style}"/><w:tblW w:w="0" w:type="auto"/>'
+                 f'<w:tblLook w:val="04A0"/></w:tblPr><w:tblGrid>']
+        parts.append('<w:gridCol/>' * columns)
+        parts.append('</w:tblGrid>')
+        for row in rows:
+            parts.append('<w:tr>')
+            for cell in list(row) + [''] * (columns - len(row)):
+                parts.append('<w:tc><w:tcPr><w:tcW w:w="0" w:type="auto"/></w:tcPr>')
+                parts.append(self._paragraph(cell))
+                parts.append('</w:tc>')
+            parts.append('</w:tr>')
+        parts.append('</w:tbl>')
+        self._write(''.join(parts))
+
+    def close(self):
+        if self._zip is None:
+            return
+        try:
+            self._write(self._footer)
+            self._flush()
+            self._body.close()
+        finally:
+            self._zip.close()
+            self._zip = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _paragraph(text, style=None):
+        properties = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ''
+        if not text:
+            return f'<w:p>{properties}</w:p>'
+        # Line breaks and tabs become elements, as python-docx does
+        text = escape(INVALID_XML_CHARS.sub('', text))
+        text = text.replace('\n', '</w:t><w:br/><w:t xml:space="preserve">')
+        text = text.replace('\t', '</w:t><w:tab/><w:t xml:space="preserve">')
+        return f'<w:p>{properties}<w:r><w:t xml:space="preserve">{text}</w:t></w:r></w:p>'
+
+    def _write(self, xml):
+        self.pending.append(xml)
+        self.pending_size += len(xml)
+        if self.pending_size >= self.buffer_size:
+            self._flush()
+
+    def _flush(self):
+        if self.pending:
+            self._body.write(''.join(self.pending).encode('utf-8'))
+            self.pending = []
+            self.pending_size = 0
@@ -0,0 +1,290 @@
+import os
+import time
+import heapq
+import itertools
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from .conversions import get_conversion
+
+DEFAULT_LANE = 'default'
+
+
+class PriorityLane:
+    """Thread pool that runs the queued call with the lowest key first"""
+
+    def __init__(self, max_workers, name):
+        self.max_workers = max_workers
+        self.name = name
+        self.heap = []
+        self.running = {}  # thread id -> (started_at, expected duration)
+        self.threads = []
+        self.idle = 0
+        self.counter = itertools.count()  # Keeps equal keys in submission order
+        self.condition = threading.Condition()
+        self.shutting_down = False
+
+    def submit(self, key, expected, fn, *args, **kwargs):
+        future = Future()
+        with self.condition:
+            if self.shutting_down:
+                raise RuntimeError('cannot schedule new futures after shutdown')
+            heapq.heappush(self.heap, (key, next(self.counter), expected, future, fn, args, kwargs))
+            if self.idle < len(self.heap) and len(self.threads) < self.max_workers:
+                thread = threading.Thread(target=self._work, daemon=True,
+                                          name=f'{self.name}_{len(self.threads)}')
+                self.threads.append(thread)
+                thread.start()
+            self.condition.notify()
+        return future
+
+    def expected_wait(self, key):
+        """Seconds until a call queued now with ``key`` is expected to start"""
+        with self.condition:
+            if len(self.running) + len(self.heap) < self.max_workers:
+                return 0.0
+            now = time.time()
+            work = sum(max(started_at + expected - now, 0)
+                       for started_at, expected in self.running.values())
+            work += sum(item[2] for item in self.heap if item[0] <= key)
+            return work / self.max_workers
+
+    def shutdown(self, wait=True):
+        """Stop taking work; queued calls still run"""
+        with self.condition:
+            self.shutting_down = True
+            self.condition.notify_all()
+            threads = list(self.threads)
+        if wait:
+            for thread in threads:
+                thread.join()
+
+    def _work(self):
+        ident = threading.get_ident()
+        while True:
+            with self.condition:
+                self.idle += 1
+                while not self.heap and not self.shutting_down:
+                    self.condition.wait()
+                self.idle -= 1
+                if not self.heap:
+                    return
+                _, _, expected, future, fn, args, kwargs = heapq.heappop(self.heap)
+                self.running[ident] = (time.time(), expected)
+
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self.condition:
+                    self.running.pop(ident, None)
+
+
+class SlotQueue:
+    """A fixed number of slots, handed to the waiting caller with the lowest key first"""
+
+    def __init__(self, slots):
+        self.free = slots
+        self.heap = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+
+    def acquire(self, key):
+        with self.condition:
+            entry = (key, next(self.counter))
+            heapq.heappush(self.heap, entry)
+            while self.free == 0 or self.heap[0] != entry:
+                self.condition.wait()
+            heapq.heappop(self.heap)
+            self.free -= 1
+            if self.free and self.heap:
+                self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.free += 1
+            self.condition.notify_all()
+
+    def waiting(self):
+        with self.condition:
+            return len(self.heap)
+
+
+class ExecutionEngine:
+    """Run conversions in per-type lanes backed by a shared process pool
+
+    Each lane is a small thread pool whose size is the lane's concurrency
+    cap. A lane thread hands CPU-bound work to the shared process pool and
+    waits for it, so at most ``cap`` jobs of a lane occupy worker processes
+    at any time. Lanes not listed in ``process_lanes`` (cheap or network
+    bound work) run directly on the lane thread. ``initializer`` runs once
+    in every worker process, e.g. to warm up converters.
+
+    Within a lane, the job with the shortest expected duration runs first.
+    Waiting jobs age: every second in the queue counts as ``aging`` seconds
+    off their expected duration, so long jobs are never starved. The lane
+    caps together allow more jobs than there are worker processes, so
+    lane threads also wait for a free process, again lowest key first
+    across all lanes. The process pool's own FIFO queue stays empty.
+    """
+
+    def __init__(self, lane_limits, process_lanes=None, max_processes=None,
+                 start_method=None, metrics=None, initializer=None, aging=1.0):
+        self.lane_limits = dict(lane_limits)
+        self.lane_limits.setdefault(DEFAULT_LANE, 2)
+        self.process_lanes = set(self.lane_limits if process_lanes is None else process_lanes)
+        self.max_processes = max_processes or os.cpu_count() or 1
+        self.start_method = start_method or self._default_start_method()
+        self.metrics = metrics
+        self.initializer = initializer
+        self.aging = aging
+
+        self.lanes = {}
+        self.pending = {}
+        self.running = {}
+        self._process_pool = None
+        self.process_slots = SlotQueue(self.max_processes)
+        self.local = threading.local()  # Priority key of the job on this lane thread
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _default_start_method():
+        # Forking a process that already runs lane threads can deadlock,
+        # so prefer a clean interpreter for the worker processes
+        methods = multiprocessing.get_all_start_methods()
+        return 'forkserver' if 'forkserver' in methods else 'spawn'
+
+    def lane_for(self, conversion_type):
+        """Get the lane a conversion type runs in
+
+        Every lane has its own concurrency cap so one heavy class of job
+        cannot starve the others.
+        """
+        spec = get_conversion(conversion_type)
+        lane = spec.lane if spec else DEFAULT_LANE
+        return lane if lane in self.lane_limits else DEFAULT_LANE
+
+    def submit(self, conversion_type, func, *args, expected_duration=None, **kwargs):
+        """Queue ``func`` on the lane for ``conversion_type`` and return a Future
+
+        ``expected_duration`` (seconds) orders the lane's queue; unknown
+        durations count as zero.
+        """
+        lane = self.lane_for(conversion_type)
+        queued_at = time.time()
+        key = self._priority(expected_duration, queued_at)
+        future = self._get_lane(lane).submit(key, expected_duration or 0, self._run_in_lane,
+                                             lane, key, queued_at, func, args, kwargs)
+
+        with self.lock:
+            self.pending[lane] = self.pending.get(lane, 0) + 1
+        future.add_done_callback(lambda _: self._finish(lane))
+        return future
+
+    def expected_wait(self, conversion_type, expected_duration=None):
+        """Seconds a job submitted now is expected to wait for its lane"""
+        lane = self.lane_for(conversion_type)
+        return self._get_lane(lane).expected_wait(self._priority(expected_duration, time.time()))
+
+    def _priority(self, expected_duration, queued_at):
+        # Ordering by expected duration minus aging * time waited is the same
+        # as ordering by this fixed key, since "now" is common to all jobs
+        return (expected_duration or 0) + self.aging * queued_at
+
+    def execute(self, conversion_type, func, *args, **kwargs):
+        """Run ``func`` where its lane says it should run and wait for the result
+
+        Call this from inside a lane (i.e. from a function passed to
+        ``submit``) so the lane's concurrency cap applies. ``func`` and its
+        arguments must be picklable for process lanes.
+        """
+        if self.lane_for(conversion_type) not in self.process_lanes:
+            return func(*args, **kwargs)
+
+        key = getattr(self.local, 'key', None)
+        self.process_slots.acquire(key if key is not None else self._priority(None, time.time()))
+        try:
+            pool = self._get_process_pool()
+            return pool.submit(func, *args, **kwargs).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. a native library crashed); start a fresh
+            # pool for the next job and report this one as failed
+            self._reset_process_pool(pool)
+            raise Exception("Conversion worker process terminated unexpectedly")
+        finally:
+            self.process_slots.release()
+
+    def get_lane_stats(self):
+        """Get configured caps and unfinished work per lane"""
+        with self.lock:
+            return {
+                lane: {
+                    'limit': limit,
+                    'process': lane in self.process_lanes,
+                    'pending': self.pending.get(lane, 0),
+                    'running': self.running.get(lane, 0)
+                }
+                for lane, limit in self.lane_limits.items()
+            }
+
+    def shutdown(self, wait=True):
+        with self.lock:
+            lanes = list(self.lanes.values())
+            pool = self._process_pool
+            self.lanes = {}
+            self._process_pool = None
+
+        for lane in lanes:
+            lane.shutdown(wait=wait)
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def _run_in_lane(self, lane, key, queued_at, func, args, kwargs):
+        if self.metrics is not None:
+            self.metrics.observe('converter_queue_wait_seconds', time.time() - queued_at,
+                                 lane=lane)
+        with self.lock:
+            self.running[lane] = self.running.get(lane, 0) + 1
+        self.local.key = key
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self.local.key = None
+            with self.lock:
+                self.running[lane] -= 1
+
+    def _finish(self, lane):
+        with self.lock:
+            self.pending[lane] -= 1
+
+    def _get_lane(self, lane):
+        with self.lock:
+            executor = self.lanes.get(lane)
+            if executor is None:
+                executor = PriorityLane(self.lane_limits[lane], f'lane-{lane}')
+                self.lanes[lane] = executor
+            return executor
+
+    def _get_process_pool(self):
+        # Created lazily so importing the app (including inside the worker
+        # processes themselves) never starts processes
+        with self.lock:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(
+                    max_workers=self.max_processes,
+                    mp_context=multiprocessing.get_context(self.start_method),
+                    initializer=self.initializer
+                )
+            return self._process_pool
+
+    def _reset_process_pool(self, broken_pool):
+        with self.lock:
+            if self._process_pool is broken_pool:
+                self._process_pool = None
+        broken_pool.shutdown(wait=False)
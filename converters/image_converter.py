@@ -1,4 +1,5 @@
 import os
+import io
 import tempfile
 from PIL import Image, ImageEnhance, ImageFilter
 import pytesseract
@@ -8,7 +9,7 @@ from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib.utils import ImageReader
 import img2pdf
-import zipfile
+from .utils import ZipStreamer
 
 class ImageConverter:
     def __init__(self):
@@ -16,24 +17,21 @@ class ImageConverter:
         # pytesseract.pytesseract.tesseract_cmd = r'/usr/bin/tesseract'
         pass
     
+    # The file methods below accept either a path or a PIL image, so that a
+    # pipeline can hand over the image produced by its previous step
+    def load(self, image_path):
+        """Open an image for in-memory processing"""
+        image = Image.open(image_path)
+        image.load()
+        return image
+    
+    def _open(self, source):
+        return source if isinstance(source, Image.Image) else Image.open(source)
+    
     def image_to_text(self, image_path, output_path):
         """Extract text from image using OCR (Optical Character Recognition)"""
         try:
-            # Open and process image
-            image = Image.open(image_path)
-            
-            # Convert to RGB if necessary
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Enhance image for better OCR results
-            image = self._enhance_image_for_ocr(image)
-            
-            # Perform OCR
-            extracted_text = pytesseract.image_to_string(image)
-            
-            if not extracted_text.strip():
-                extracted_text = "No text could be extracted from the image."
+            extracted_text = self.extract_text(self._open(image_path))
             
             # Save text to file
             with open(output_path, 'w', encoding='utf-8') as txt_file:
@@ -44,6 +42,22 @@ class ImageConverter:
         except Exception as e:
             raise Exception(f"Image to text conversion failed: {str(e)}")
     
+    def extract_text(self, image):
+        """Run OCR on a PIL image and return the text"""
+        # Convert to RGB if necessary
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Enhance image for better OCR results
+        image = self._enhance_image_for_ocr(image)
+        
+        # Perform OCR
+        extracted_text = pytesseract.image_to_string(image)
+        
+        if not extracted_text.strip():
+            extracted_text = "No text could be extracted from the image."
+        return extracted_text
+    
     def _enhance_image_for_ocr(self, image):
         """Enhance image quality for better OCR results"""
         try:
@@ -73,8 +87,15 @@ class ImageConverter:
         try:
             # Method 1: Using img2pdf (preserves image quality better)
             try:
+                if isinstance(image_path, Image.Image):
+                    # Encode the in-memory image for img2pdf without touching disk
+                    buffer = io.BytesIO()
+                    image_path.save(buffer, format=image_path.format or 'PNG')
+                    source = buffer.getvalue()
+                else:
+                    source = image_path
                 with open(output_path, "wb") as pdf_file:
-                    pdf_file.write(img2pdf.convert(image_path))
+                    pdf_file.write(img2pdf.convert(source))
                 return output_path
             except:
                 # Method 2: Fallback using ReportLab
@@ -86,7 +107,7 @@ class ImageConverter:
     
     def _image_to_pdf_reportlab(self, image_path, output_path):
         """Convert image to PDF using ReportLab"""
-        image = Image.open(image_path)
+        image = self._open(image_path)
         
         # Create PDF with image
         c = canvas.Canvas(output_path, pagesize=A4)
@@ -107,20 +128,14 @@ class ImageConverter:
         x = (page_width - new_width) / 2
         y = (page_height - new_height) / 2
         
-        c.drawImage(image_path, x, y, width=new_width, height=new_height)
+        c.drawImage(ImageReader(image), x, y, width=new_width, height=new_height)
         c.save()
     
     def resize_image(self, input_path, output_path, size=(800, 600), maintain_aspect=True):
         """Resize image to specified dimensions"""
         try:
-            with Image.open(input_path) as image:
-                if maintain_aspect:
-                    # Calculate new size maintaining aspect ratio
-                    image.thumbnail(size, Image.Resampling.LANCZOS)
-                    resized_image = image
-                else:
-                    # Resize to exact dimensions
-                    resized_image = image.resize(size, Image.Resampling.LANCZOS)
+            with self._open(input_path) as image:
+                resized_image = self.resize(image, size, maintain_aspect)
                 
                 # Save resized image
                 resized_image.save(output_path, optimize=True, quality=95)
@@ -130,6 +145,15 @@ class ImageConverter:
         except Exception as e:
             raise Exception(f"Image resizing failed: {str(e)}")
     
+    def resize(self, image, size=(800, 600), maintain_aspect=True):
+        """Resize a PIL image"""
+        if maintain_aspect:
+            # Calculate new size maintaining aspect ratio
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+            return image
+        # Resize to exact dimensions
+        return image.resize(size, Image.Resampling.LANCZOS)
+    
     def convert_image_format(self, input_path, output_path, target_format=None):
         """Convert image to different format"""
         try:
@@ -149,7 +173,7 @@ class ImageConverter:
             
             pil_format = format_map.get(target_format.lower(), target_format.upper())
             
-            with Image.open(input_path) as image:
+            with self._open(input_path) as image:
                 # Convert RGBA to RGB for formats that don't support transparency
                 if pil_format == 'JPEG' and image.mode in ('RGBA', 'LA'):
                     background = Image.new('RGB', image.size, (255, 255, 255))
@@ -167,7 +191,7 @@ class ImageConverter:
     def compress_image(self, input_path, output_path, quality=85):
         """Compress image to reduce file size"""
         try:
-            with Image.open(input_path) as image:
+            with self._open(input_path) as image:
                 # Convert RGBA to RGB if saving as JPEG
                 if output_path.lower().endswith('.jpg') or output_path.lower().endswith('.jpeg'):
                     if image.mode in ('RGBA', 'LA'):
@@ -235,50 +259,55 @@ class ImageConverter:
     def apply_image_filter(self, input_path, output_path, filter_type='enhance'):
         """Apply filters to enhance image"""
         try:
-            with Image.open(input_path) as image:
-                if filter_type == 'enhance':
-                    # Enhance sharpness and contrast
-                    enhancer = ImageEnhance.Sharpness(image)
-                    image = enhancer.enhance(1.2)
-                    
-                    enhancer = ImageEnhance.Contrast(image)
-                    image = enhancer.enhance(1.1)
-                    
-                elif filter_type == 'blur':
-                    image = image.filter(ImageFilter.BLUR)
-                    
-                elif filter_type == 'sharpen':
-                    image = image.filter(ImageFilter.SHARPEN)
-                    
-                elif filter_type == 'smooth':
-                    image = image.filter(ImageFilter.SMOOTH)
-                    
-                elif filter_type == 'grayscale':
-                    image = image.convert('L')
-                    
+            with self._open(input_path) as image:
                 # Save filtered image
-                image.save(output_path, quality=95)
+                self.apply_filter(image, filter_type).save(output_path, quality=95)
                 
             return output_path
             
         except Exception as e:
             raise Exception(f"Image filter application failed: {str(e)}")
     
+    def apply_filter(self, image, filter_type='enhance'):
+        """Apply a filter to a PIL image"""
+        if filter_type == 'enhance':
+            # Enhance sharpness and contrast
+            enhancer = ImageEnhance.Sharpness(image)
+            image = enhancer.enhance(1.2)
+            
+            enhancer = ImageEnhance.Contrast(image)
+            image = enhancer.enhance(1.1)
+            
+        elif filter_type == 'blur':
+            image = image.filter(ImageFilter.BLUR)
+            
+        elif filter_type == 'sharpen':
+            image = image.filter(ImageFilter.SHARPEN)
+            
+        elif filter_type == 'smooth':
+            image = image.filter(ImageFilter.SMOOTH)
+            
+        elif filter_type == 'grayscale':
+            image = image.convert('L')
+        
+        return image
+    
     def rotate_image(self, input_path, output_path, angle=90):
         """Rotate image by specified angle"""
         try:
-            with Image.open(input_path) as image:
-                # Rotate image
-                rotated_image = image.rotate(angle, expand=True)
-                
+            with self._open(input_path) as image:
                 # Save rotated image
-                rotated_image.save(output_path, quality=95)
+                self.rotate(image, angle).save(output_path, quality=95)
                 
             return output_path
             
         except Exception as e:
             raise Exception(f"Image rotation failed: {str(e)}")
     
+    def rotate(self, image, angle=90):
+        """Rotate a PIL image, growing the canvas to fit"""
+        return image.rotate(angle, expand=True)
+    
     def crop_image(self, input_path, output_path, crop_box=(0, 0, 100, 100)):
         """Crop image to specified area"""
         try:
@@ -297,16 +326,23 @@ class ImageConverter:
     def create_image_zip(self, image_paths, output_path):
         """Create a ZIP file containing multiple images"""
         try:
-            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for image_path in image_paths:
-                    if os.path.exists(image_path):
-                        zip_file.write(image_path, os.path.basename(image_path))
+            with open(output_path, 'wb') as zip_file:
+                for chunk in self.stream_image_zip(image_paths):
+                    zip_file.write(chunk)
             
             return output_path
             
         except Exception as e:
             raise Exception(f"Image ZIP creation failed: {str(e)}")
     
+    def stream_image_zip(self, image_paths):
+        """Yield a ZIP archive of multiple images as it is built"""
+        entries = (
+            (os.path.basename(image_path), image_path)
+            for image_path in image_paths if os.path.exists(image_path)
+        )
+        return ZipStreamer.stream(entries)
+    
     def get_image_info(self, image_path):
         """Get image information"""
         try:
@@ -0,0 +1,228 @@
+import os
+import time
+import uuid
+import hashlib
+import threading
+
+
+class UploadTooLarge(Exception):
+    """Raised while streaming an upload that exceeds its size limit"""
+
+
+class IngestedFile:
+    """Upload sink that writes, hashes, counts and sniffs in a single pass
+
+    Instances are handed to the multipart parser as the target stream for a
+    file part, so the request body goes straight to ``path`` in large
+    buffered writes. Once the part is complete the content hash, byte count
+    and the first bytes of the file (for magic-number checks) are available
+    without touching the file again. Writing past ``max_size`` removes the
+    partial file and raises UploadTooLarge.
+
+    With an UploadStore, the upload is written to a temp file in the store
+    and only becomes ``path`` once complete: as a link to the stored copy
+    of its content, which it creates if this content is new.
+    """
+
+    HEADER_SIZE = 1024
+    BUFFER_SIZE = 1024 * 1024
+
+    def __init__(self, path, max_size=None, algorithm='sha256', store=None):
+        self.path = path
+        self.max_size = max_size
+        self.store = store
+        self.size = 0
+        self.header = b''
+        self.claimed = False  # Set once a job takes ownership of the file
+        self.deduplicated = False  # Content was already in the store
+        self.started_at = time.time()
+        self.finished_at = None
+        self._hash = hashlib.new(algorithm)
+        self._write_path = store.temp_path() if store is not None else path
+        self._writer = open(self._write_path, 'wb', buffering=self.BUFFER_SIZE)
+        self._reader = None
+
+    @property
+    def filename(self):
+        return os.path.basename(self.path)
+
+    @property
+    def content_hash(self):
+        return self._hash.hexdigest()
+
+    @property
+    def upload_time(self):
+        """Seconds spent receiving the upload, once it is complete"""
+        if self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @property
+    def closed(self):
+        return self._writer is None and self._reader is None
+
+    def write(self, data):
+        if self._writer is None:
+            raise ValueError("Upload is already complete")
+
+        if self.max_size is not None and self.size + len(data) > self.max_size:
+            self.discard()
+            raise UploadTooLarge(
+                f"File too large. Maximum size is {self.max_size // (1024 * 1024)}MB"
+            )
+
+        if len(self.header) < self.HEADER_SIZE:
+            self.header += data[:self.HEADER_SIZE - len(self.header)]
+        self._hash.update(data)
+        self.size += len(data)
+        self._writer.write(data)
+        return len(data)
+
+    def finish(self):
+        """Flush the upload to disk; no more data will be written"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.finished_at = time.time()
+            if self.store is not None:
+                self.deduplicated = self.store.add(self._write_path, self.content_hash,
+                                                   self.path, self.size)
+
+    def copy_from(self, stream, chunk_size=BUFFER_SIZE):
+        """Ingest an already-parsed upload stream"""
+        for chunk in iter(lambda: stream.read(chunk_size), b''):
+            self.write(chunk)
+        self.finish()
+        return self
+
+    def seek(self, offset, whence=0):
+        # The multipart parser rewinds the stream once the part is complete;
+        # don't open a reader until someone actually reads the data back
+        self.finish()
+        if self._reader is None and offset == 0 and whence == 0:
+            return 0
+        return self._get_reader().seek(offset, whence)
+
+    def tell(self):
+        if self._writer is not None:
+            return self.size
+        return self._get_reader().tell()
+
+    def read(self, size=-1):
+        self.finish()
+        return self._get_reader().read(size)
+
+    def readline(self, size=-1):
+        self.finish()
+        return self._get_reader().readline(size)
+
+    def close(self):
+        self.finish()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+    def discard(self):
+        """Close and delete the partially or fully written upload"""
+        if self._writer is not None:
+            # Incomplete: never hand it to the store
+            self._writer.close()
+            self._writer = None
+        self.close()
+        for path in {self._write_path, self.path}:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _get_reader(self):
+        if self._reader is None:
+            self._reader = open(self.path, 'rb')
+        return self._reader
+
+
+class UploadStore:
+    """Content-addressed store that keeps each distinct upload once
+
+    Content lives in ``root/.store`` under a two-character shard of its
+    hash. Every upload is a hard link to that object, named
+    ``<uuid>_<filename>`` in a shard of ``root`` picked by the uuid, so no
+    folder grows with the number of uploads. An object's link count is its
+    reference count: one for the store plus one per live upload. Removing
+    an upload is a plain unlink, which also works from worker processes.
+    An object outlives its uploads until it expires (the reaper watches
+    ``root`` recursively), so a re-upload of the same content within that
+    time is only linked, not stored again. On filesystems without hard
+    links uploads are kept as separate files.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.objects_dir = os.path.join(root, '.store')
+        self.temp_dir = os.path.join(self.objects_dir, 'tmp')
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.lock = threading.Lock()
+
+        os.makedirs(self.temp_dir, exist_ok=True)
+
+    def reference_path(self, unique_filename):
+        """Where to keep an upload named ``unique_filename`` (starting with its uuid)"""
+        return os.path.join(self.root, unique_filename[:2], unique_filename)
+
+    def object_path(self, content_hash):
+        return os.path.join(self.objects_dir, content_hash[:2], content_hash)
+
+    def temp_path(self):
+        """A fresh path in the store to stream an upload to"""
+        return os.path.join(self.temp_dir, uuid.uuid4().hex)
+
+    def add(self, temp_path, content_hash, reference_path, size=0):
+        """Turn a completely written temp file into the upload at ``reference_path``
+
+        Returns True if the content was already stored, in which case the
+        temp file is dropped and the upload links to the existing object.
+        """
+        object_path = self.object_path(content_hash)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.makedirs(os.path.dirname(reference_path), exist_ok=True)
+
+        try:
+            # Retry if the object expires between the two links
+            for _ in range(3):
+                try:
+                    os.link(object_path, reference_path)
+                except FileNotFoundError:
+                    pass
+                else:
+                    os.remove(temp_path)
+                    with self.lock:
+                        self.deduplicated += 1
+                        self.bytes_saved += size
+                    return True
+
+                try:
+                    os.link(temp_path, object_path)
+                except FileExistsError:
+                    continue  # Stored concurrently by another upload
+                os.replace(temp_path, reference_path)
+                return False
+        except OSError:
+            pass
+
+        # No hard links here: keep the upload as a file of its own
+        if os.path.exists(temp_path):
+            os.replace(temp_path, reference_path)
+        return False
+
+    def references(self, content_hash):
+        """Number of live uploads of this content"""
+        try:
+            return os.stat(self.object_path(content_hash)).st_nlink - 1
+        except OSError:
+            return 0
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                'deduplicated': self.deduplicated,
+                'bytes_saved': self.bytes_saved
+            }
@@ -0,0 +1,246 @@
+import os
+import re
+import json
+import uuid
+import time
+import threading
+from datetime import timedelta
+
+JOB_ID_PATTERN = re.compile(r'[0-9a-f]{32}')
+
+_local = threading.local()
+
+
+def current_job():
+    """Get the Job being run by the calling thread, if any"""
+    return getattr(_local, 'job', None)
+
+
+class Job:
+    """A single queued conversion and its outcome"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    FINISHED_STATES = (COMPLETED, FAILED)
+
+    def __init__(self, job_id=None, metadata=None):
+        self.id = job_id or uuid.uuid4().hex
+        self.status = self.QUEUED
+        self.metadata = metadata or {}
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.expected_duration = None  # Predicted run time in seconds
+        self.eta = None  # Predicted completion time
+
+    @property
+    def is_finished(self):
+        return self.status in self.FINISHED_STATES
+
+    def to_dict(self):
+        """Serialize the job, including server-side paths"""
+        return {
+            'id': self.id,
+            'status': self.status,
+            'metadata': self.metadata,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'result': self.result,
+            'error': self.error,
+            'expected_duration': self.expected_duration,
+            'eta': self.eta
+        }
+
+    def to_public_dict(self):
+        """Serialize the job for API clients (no server-side paths)"""
+        data = self.to_dict()
+        if self.result:
+            data['result'] = {
+                key: value for key, value in self.result.items()
+                if key not in ('output_path', 'profile')
+            }
+        if self.eta is not None and not self.is_finished:
+            data['eta_seconds'] = round(max(self.eta - time.time(), 0), 1)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        job = cls(job_id=data['id'], metadata=data.get('metadata'))
+        job.status = data.get('status', cls.QUEUED)
+        job.created_at = data.get('created_at', job.created_at)
+        job.started_at = data.get('started_at')
+        job.finished_at = data.get('finished_at')
+        job.result = data.get('result')
+        job.error = data.get('error')
+        job.expected_duration = data.get('expected_duration')
+        job.eta = data.get('eta')
+        return job
+
+
+class JobManager:
+    """Run conversions on the execution engine and track their status
+
+    Job state is mirrored to small JSON files in ``state_dir`` so that any
+    worker process can answer status queries for a job, not only the one
+    that accepted the upload. State files of finished jobs are deleted
+    after ``retention``, whichever process (or earlier run) wrote them;
+    the folder is swept at most every ``sweep_interval`` seconds.
+    """
+
+    def __init__(self, engine, state_dir=None, retention=timedelta(hours=1), sweep_interval=60):
+        self.engine = engine
+        self.state_dir = state_dir
+        self.retention = retention
+        self.sweep_interval = sweep_interval
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self._swept_at = 0
+
+        if self.state_dir:
+            os.makedirs(self.state_dir, exist_ok=True)
+
+    def submit(self, conversion_type, func, *args, metadata=None, expected_duration=None,
+               **kwargs):
+        """Queue ``func(*args, **kwargs)`` in the lane for ``conversion_type``
+
+        Returns the new Job immediately. With an ``expected_duration`` the
+        job is scheduled shortest-first and gets an ETA.
+        """
+        self.prune()
+
+        job = Job(metadata=metadata)
+        if expected_duration is not None:
+            job.expected_duration = expected_duration
+            job.eta = (time.time() + expected_duration +
+                       self.engine.expected_wait(conversion_type, expected_duration))
+        with self.lock:
+            self.jobs[job.id] = job
+        self._save(job)
+
+        self.engine.submit(conversion_type, self._run, job, func, args, kwargs,
+                           expected_duration=expected_duration)
+        return job
+
+    def get(self, job_id):
+        """Look up a job by id, falling back to the shared state directory"""
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is not None:
+            return job
+        return self._load(job_id)
+
+    def _run(self, job, func, args, kwargs):
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        if job.expected_duration is not None:
+            job.eta = job.started_at + job.expected_duration
+        self._save(job)
+
+        _local.job = job
+        try:
+            result = func(*args, **kwargs)
+            if result and result.get('success'):
+                job.result = result
+                job.status = Job.COMPLETED
+            else:
+                job.error = (result or {}).get('error', 'Conversion failed')
+                job.status = Job.FAILED
+        except Exception as e:
+            job.error = str(e)
+            job.status = Job.FAILED
+        finally:
+            _local.job = None
+            job.finished_at = time.time()
+            self._save(job)
+
+    def prune(self):
+        """Forget finished jobs older than the retention period"""
+        cutoff = time.time() - self.retention.total_seconds()
+        with self.lock:
+            expired = [
+                job_id for job_id, job in self.jobs.items()
+                if job.is_finished and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self.jobs[job_id]
+
+        for job_id in expired:
+            state_path = self._state_path(job_id)
+            if state_path and os.path.exists(state_path):
+                try:
+                    os.remove(state_path)
+                except OSError:
+                    pass
+
+        return len(expired) + self._sweep_state_dir(cutoff)
+
+    def _sweep_state_dir(self, cutoff):
+        # The folder is shared with other workers (and other files, e.g.
+        # the stats database), so only our own state files are considered
+        now = time.time()
+        with self.lock:
+            if not self.state_dir or now - self._swept_at < self.sweep_interval:
+                return 0
+            self._swept_at = now
+
+        removed = 0
+        try:
+            entries = list(os.scandir(self.state_dir))
+        except OSError:
+            return 0
+        for entry in entries:
+            job_id, _, suffix = entry.name.partition('.')
+            if not JOB_ID_PATTERN.fullmatch(job_id) or not suffix.startswith('json'):
+                continue
+            try:
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                # State is rewritten when a job starts and finishes, so an
+                # old file can still belong to a long job that is running
+                if suffix == 'json':
+                    job = self._load(job_id)
+                    if job is not None and not job.is_finished:
+                        continue
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _state_path(self, job_id):
+        # Job ids come from URLs, so only accept the hex ids we generate
+        if not self.state_dir or not JOB_ID_PATTERN.fullmatch(job_id or ''):
+            return None
+        return os.path.join(self.state_dir, f"{job_id}.json")
+
+    def _save(self, job):
+        state_path = self._state_path(job.id)
+        if not state_path:
+            return
+
+        # Write to a temporary file first so readers never see partial JSON
+        temp_path = f"{state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as state_file:
+                json.dump(job.to_dict(), state_file)
+            os.replace(temp_path, state_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _load(self, job_id):
+        state_path = self._state_path(job_id)
+        if not state_path or not os.path.exists(state_path):
+            return None
+
+        try:
+            with open(state_path, 'r', encoding='utf-8') as state_file:
+                return Job.from_dict(json.load(state_file))
+        except (OSError, ValueError, KeyError):
+            return None
@@ -0,0 +1,198 @@
+import bisect
+import threading
+
+KB = 1024
+MB = 1024 * 1024
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+SIZE_BUCKETS = (10 * KB, 100 * KB, 512 * KB, 1 * MB, 5 * MB, 10 * MB, 25 * MB,
+                50 * MB, 100 * MB, 200 * MB)
+THROUGHPUT_BUCKETS = (10 * KB, 100 * KB, 512 * KB, 1 * MB, 5 * MB, 10 * MB,
+                      50 * MB, 100 * MB)
+
+# name: (type, help text, histogram buckets)
+METRICS = {
+    'converter_conversion_duration_seconds': (
+        'histogram', 'Time spent converting a file', LATENCY_BUCKETS),
+    'converter_input_size_bytes': (
+        'histogram', 'Size of uploaded files', SIZE_BUCKETS),
+    'converter_output_size_bytes': (
+        'histogram', 'Size of converted files', SIZE_BUCKETS),
+    'converter_throughput_bytes_per_second': (
+        'histogram', 'Input bytes converted per second', THROUGHPUT_BUCKETS),
+    'converter_queue_wait_seconds': (
+        'histogram', 'Time a conversion waited for a free slot in its lane', LATENCY_BUCKETS),
+    'converter_conversions_total': (
+        'counter', 'Finished conversions by outcome', None),
+    'converter_cache_lookups_total': (
+        'counter', 'Result cache lookups by outcome', None),
+    'converter_conversions_in_flight': (
+        'gauge', 'Conversions currently running', None),
+    'converter_lane_queued': (
+        'gauge', 'Conversions waiting for a slot in their lane', None),
+    'converter_lane_running': (
+        'gauge', 'Conversions running in each lane', None),
+    'converter_lane_limit': (
+        'gauge', 'Concurrency cap of each lane', None),
+    'converter_admission_in_flight': (
+        'gauge', 'Estimated cost of admitted conversions per resource', None),
+    'converter_admission_budget': (
+        'gauge', 'Admission budget per resource', None),
+    'converter_admission_rejected_total': (
+        'counter', 'Uploads rejected with 429 because a budget was exhausted', None)
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Estimate a quantile by interpolating inside its bucket"""
+        if self.count == 0:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if cumulative + count >= rank and count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index > 0 else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-1]
+
+    def cumulative_counts(self):
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield bound, total
+
+
+class ConversionMetrics:
+    """In-process conversion instrumentation exported as Prometheus text"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+        self.collectors = []
+
+    def observe(self, name, value, **labels):
+        """Add an observation to a histogram"""
+        key = (name, self._label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        """Increment a counter or gauge"""
+        key = (name, self._label_key(labels))
+        values = self.counters if METRICS[name][0] == 'counter' else self.gauges
+        with self.lock:
+            values[key] = values.get(key, 0) + amount
+
+    def dec(self, name, amount=1, **labels):
+        self.inc(name, -amount, **labels)
+
+    def add_collector(self, collector):
+        """Register a callable returning ``[(name, labels, value)]`` gauge samples at scrape time"""
+        self.collectors.append(collector)
+
+    def record_conversion(self, conversion_type, duration, input_size, output_size, success):
+        """Record the timings and sizes of one finished conversion"""
+        status = 'success' if success else 'failure'
+        self.inc('converter_conversions_total', conversion_type=conversion_type, status=status)
+        self.observe('converter_conversion_duration_seconds', duration,
+                     conversion_type=conversion_type)
+
+        if input_size is not None:
+            self.observe('converter_input_size_bytes', input_size,
+                         conversion_type=conversion_type)
+            if success and duration > 0:
+                self.observe('converter_throughput_bytes_per_second', input_size / duration,
+                             conversion_type=conversion_type)
+        if output_size is not None:
+            self.observe('converter_output_size_bytes', output_size,
+                         conversion_type=conversion_type)
+
+    def get_latency_summary(self):
+        """Get p50/p95/p99 conversion latency per conversion type"""
+        summary = {}
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                if name != 'converter_conversion_duration_seconds':
+                    continue
+                conversion_type = dict(labels).get('conversion_type')
+                summary[conversion_type] = {
+                    'count': histogram.count,
+                    'p50': histogram.quantile(0.50),
+                    'p95': histogram.quantile(0.95),
+                    'p99': histogram.quantile(0.99)
+                }
+        return summary
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        samples = {name: [] for name in METRICS}
+
+        with self.lock:
+            for (name, labels), histogram in self.histograms.items():
+                for bound, total in histogram.cumulative_counts():
+                    le = '+Inf' if bound == float('inf') else self._format_value(bound)
+                    samples[name].append((f'{name}_bucket', labels + (('le', le),), total))
+                samples[name].append((f'{name}_sum', labels, histogram.sum))
+                samples[name].append((f'{name}_count', labels, histogram.count))
+            for values in (self.counters, self.gauges):
+                for (name, labels), value in values.items():
+                    samples[name].append((name, labels, value))
+
+        for collector in self.collectors:
+            for name, labels, value in collector():
+                samples[name].append((name, self._label_key(labels), value))
+
+        lines = []
+        for name, (metric_type, help_text, _) in METRICS.items():
+            if not samples[name]:
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for sample_name, labels, value in samples[name]:
+                lines.append(f'{sample_name}{self._format_labels(labels)} {self._format_value(value)}')
+
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _label_key(labels):
+        return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    @staticmethod
+    def _format_labels(labels):
+        if not labels:
+            return ''
+        pairs = ','.join(
+            '{}="{}"'.format(key, value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, value in labels
+        )
+        return '{' + pairs + '}'
+
+    @staticmethod
+    def _format_value(value):
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        return repr(value) if isinstance(value, float) else str(value)
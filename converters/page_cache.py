@@ -0,0 +1,116 @@
+import json
+import time
+import zlib
+from .storage import SizeBudget, SQLiteStore
+
+
+class PageCache(SQLiteStore):
+    """Per-page extraction results shared by every worker process through SQLite
+
+    Entries are keyed by the document's content hash, a ``kind`` naming
+    what was extracted and how (e.g. ``text:fitz``), and the 0-based page
+    number, so any later conversion of the same bytes, whatever its name,
+    output format or page selection, reads the pages instead of parsing
+    them again. Values are stored as zlib-compressed JSON. A document's
+    pages are evicted together, least recently used first, once the
+    stored size passes ``max_size_bytes``.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS pages (
+            document TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            used REAL NOT NULL,
+            PRIMARY KEY (document, kind, page)
+        )
+    """
+
+    def __init__(self, db_path, max_size_bytes=256 * 1024 * 1024):
+        super().__init__(db_path)
+        self.max_size = max_size_bytes
+        self.budget = SizeBudget(max_size_bytes, self.evict)
+
+    def cached_pages(self, document, kind):
+        """Get the set of pages stored for a document, marking it as used"""
+        with self.db_lock:
+            conn = self._get_connection()
+            with conn:
+                conn.execute("UPDATE pages SET used = ? WHERE document = ? AND kind = ?",
+                             (time.time(), document, kind))
+                rows = conn.execute("SELECT page FROM pages WHERE document = ? AND kind = ?",
+                                    (document, kind)).fetchall()
+        return {page for page, in rows}
+
+    def get(self, document, kind, pages):
+        """Get ``{page: value}`` for the given pages that are stored"""
+        if not pages:
+            return {}
+
+        placeholders = ",".join("?" * len(pages))
+        with self.db_lock:
+            rows = self._get_connection().execute(
+                f"SELECT page, data FROM pages WHERE document = ? AND kind = ? "
+                f"AND page IN ({placeholders})",
+                (document, kind, *pages)
+            ).fetchall()
+        return {page: json.loads(zlib.decompress(data)) for page, data in rows}
+
+    def put(self, document, kind, values):
+        """Store ``{page: value}`` for a document"""
+        now = time.time()
+        rows = []
+        added_size = 0
+        for page, value in values.items():
+            data = zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+            rows.append((document, kind, page, data, len(data), now))
+            added_size += len(data)
+
+        with self.db_lock:
+            conn = self._get_connection()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO pages (document, kind, page, data, size, used) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+        self.budget.add(added_size)
+
+    def evict(self):
+        """Remove least recently used documents until the cache fits its budget"""
+        with self.db_lock:
+            conn = self._get_connection()
+            entries = conn.execute(
+                "SELECT document, kind, MAX(used), SUM(size) FROM pages "
+                "GROUP BY document, kind ORDER BY MAX(used)"
+            ).fetchall()
+            total_size = sum(size for _, _, _, size in entries)
+
+            removed = []
+            for document, kind, _, size in entries:
+                if total_size <= self.max_size:
+                    break
+                removed.append((document, kind))
+                total_size -= size
+
+            if removed:
+                with conn:
+                    conn.executemany("DELETE FROM pages WHERE document = ? AND kind = ?",
+                                     removed)
+
+        self.budget.measured(total_size)
+        return len(removed)
+
+    def get_stats(self):
+        with self.db_lock:
+            documents, pages, size = self._get_connection().execute(
+                "SELECT COUNT(DISTINCT document), COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        return {
+            'documents': documents,
+            'pages': pages,
+            'size': size,
+            'max_size': self.max_size
+        }
@@ -1,74 +1,382 @@
 import fitz  # PyMuPDF
 import pdfplumber
-from docx import Document
 from gtts import gTTS
 import os
+import math
+import zipfile
 import tempfile
+import itertools
+import collections
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from .conversions import select_pages
+from .utils import FileHasher
+from .docx_writer import DocxWriter
+
+# Fewest pages worth extracting in parallel, per engine: below this,
+# starting the worker processes costs more than it saves
+PARALLEL_MIN_PAGES = {'fitz': 300, 'pdfplumber': 20, 'layout': 300}
+
+# Pages read from or written to the page cache in one query
+CACHE_BATCH_PAGES = 64
+
+# Font size relative to the body text from which a short block is a
+# heading, and its level
+HEADING_SIZES = ((1.6, 1), (1.3, 2), (1.15, 3))
+
+
+def page_texts(pdf_path, engine='fitz', pages=None):
+    """Yield the text of the given 0-based ``pages`` (default: all), one at a time
+    
+    ``fitz`` (PyMuPDF) is many times faster; ``pdfplumber`` follows the
+    page layout more closely. Only the given pages are parsed.
+    """
+    if engine == 'pdfplumber':
+        selection = [index + 1 for index in pages] if pages is not None else None
+        with pdfplumber.open(pdf_path, pages=selection) as pdf:
+            for page in pdf.pages:
+                yield page.extract_text()
+                # Drop the page's parsed objects before the next one
+                page.close()
+    elif engine == 'fitz':
+        with fitz.open(pdf_path) as doc:
+            for index in (pages if pages is not None else range(doc.page_count)):
+                yield doc.load_page(index).get_text().rstrip('\n')
+    else:
+        raise ValueError(f"Unknown PDF text engine: {engine}")
+
+
+def page_layouts(pdf_path, pages=None):
+    """Yield the text blocks of the given 0-based ``pages`` (default: all)
+    
+    Each block is ``[size, bold, rows]``: the font size of most of its
+    characters, whether they are all bold, and its lines grouped into
+    visual rows of ``[x0, text]`` cells. PyMuPDF puts each row of a table
+    in one block, one line per cell, so table rows are the rows with
+    several cells. Blocks are plain lists so they store compactly in the
+    page cache.
+    """
+    with fitz.open(pdf_path) as doc:
+        for index in (pages if pages is not None else range(doc.page_count)):
+            yield layout_blocks(doc.load_page(index).get_text('dict', flags=fitz.TEXTFLAGS_TEXT))
+
+
+def page_texts_and_layouts(pdf_path, pages=None):
+    """Yield ``[text, blocks]`` of each page from one PyMuPDF text pass
+    
+    The same as page_texts with ``fitz`` and page_layouts, for little
+    more than the cost of the layout alone.
+    """
+    with fitz.open(pdf_path) as doc:
+        for index in (pages if pages is not None else range(doc.page_count)):
+            page = doc.load_page(index)
+            textpage = page.get_textpage(flags=fitz.TEXTFLAGS_TEXT)
+            yield [page.get_text(textpage=textpage).rstrip('\n'),
+                   layout_blocks(page.get_text('dict', textpage=textpage))]
+
+
+def layout_blocks(page_dict):
+    """Blocks (see page_layouts) of a page's PyMuPDF ``dict`` text"""
+    blocks = []
+    for block in page_dict['blocks']:
+        sizes = {}
+        bold = True
+        rows = []
+        bottom = None
+        for line in block['lines']:
+            spans = line['spans']
+            text = (spans[0]['text'] if len(spans) == 1
+                    else ''.join(span['text'] for span in spans)).strip()
+            if not text:
+                continue
+            for span in spans:
+                size = span['size']
+                sizes[size] = sizes.get(size, 0) + len(span['text'])
+                if bold and not span['flags'] & fitz.TEXT_FONT_BOLD and span['text'].strip():
+                    bold = False
+            
+            x0, y0, _, y1 = line['bbox']
+            if bottom is not None and (y0 + y1) / 2 < bottom:
+                rows[-1].append([round(x0, 1), text])
+                rows[-1].sort()
+                bottom = max(bottom, y1)
+            else:
+                rows.append([[round(x0, 1), text]])
+                bottom = y1
+        
+        if rows:
+            blocks.append([round(max(sizes, key=sizes.get), 1), bold, rows])
+    return blocks
+
+
+def page_results(pdf_path, engine, pages=None):
+    """Yield per page what an engine extracts: text, blocks for ``layout``,
+    or both for ``fitz+layout``"""
+    if engine == 'layout':
+        return page_layouts(pdf_path, pages)
+    if engine == 'fitz+layout':
+        return page_texts_and_layouts(pdf_path, pages)
+    return page_texts(pdf_path, engine, pages)
+
+
+def extract_pages(pdf_path, engine, pages):
+    """Extraction of a run of pages, done in a worker process"""
+    return list(page_results(pdf_path, engine, pages))
+
+
+def join_lines(lines):
+    """Join the lines of a paragraph, mending words hyphenated at line ends"""
+    parts = []
+    for line in lines:
+        if parts and parts[-1][-1:] == '-' and parts[-1][-2:-1].isalpha() and line[:1].islower():
+            parts[-1] = parts[-1][:-1] + line
+        else:
+            parts.append(line)
+    return ' '.join(parts)
+
+
+def heading_level(size, bold, text, lines, body_size):
+    """Heading level of a block of text, or None for body text"""
+    if not body_size or lines > 3 or len(text) > 200:
+        return None
+    for ratio, level in HEADING_SIZES:
+        if size >= body_size * ratio:
+            return level
+    # A short bold line in body size, e.g. "Results"
+    if bold and lines == 1 and size >= body_size and len(text) <= 100 and not text.endswith('.'):
+        return 3
+    return None
+
 
 class PDFConverter:
-    def __init__(self):
-        pass
+    """PDF conversions
+    
+    Text is extracted page by page. Every conversion can be limited to a
+    ``pages`` selection (``3-7``, ``1,4,10-``) and to its first
+    ``max_pages`` pages; the other pages are never parsed. Selections of
+    at least ``parallel_min_pages`` pages (per engine) are split into runs
+    that ``workers`` processes extract side by side, and the pages come
+    back in order. Each conversion starts its own extraction processes,
+    so the PDF lane limit times ``workers`` bounds the processes in use.
+    With a ``page_cache`` (see page_cache.PageCache), the text (or layout
+    blocks) of every page is kept by content hash and engine, and later
+    conversions of the
+    same document only parse the pages not seen before.
+    """
     
-    def pdf_to_txt(self, pdf_path, output_path):
-        """Convert PDF to plain text"""
+    def __init__(self, workers=None, parallel_min_pages=None, page_cache=None):
+        self.workers = workers if workers is not None else os.cpu_count() or 1
+        self.parallel_min_pages = dict(PARALLEL_MIN_PAGES, **(parallel_min_pages or {}))
+        self.page_cache = page_cache
+    
+    def pdf_to_txt(self, pdf_path, output_path, engine='fitz', workers=None, pages=None,
+                   max_pages=None):
+        """Convert PDF to plain text, writing it out a page at a time"""
         try:
-            text_content = ""
-            
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content += page_text + "\n\n"
-            
             with open(output_path, 'w', encoding='utf-8') as txt_file:
-                txt_file.write(text_content)
+                for page_text in self.iter_page_text(pdf_path, engine, workers, pages, max_pages):
+                    if page_text:
+                        txt_file.write(page_text + "\n\n")
             
             return output_path
             
         except Exception as e:
             raise Exception(f"PDF to TXT conversion failed: {str(e)}")
     
-    def pdf_to_docx(self, pdf_path, output_path):
-        """Convert PDF to DOCX"""
+    def extract_text(self, pdf_path, engine='fitz', workers=None, pages=None, max_pages=None):
+        """Extract the text of every page, separating pages with a blank line"""
+        return "".join(page_text + "\n\n"
+                       for page_text in self.iter_page_text(pdf_path, engine, workers, pages,
+                                                            max_pages)
+                       if page_text)
+    
+    def iter_page_text(self, pdf_path, engine='fitz', workers=None, pages=None, max_pages=None):
+        """Yield the text of each selected page in order
+        
+        ``workers`` overrides the converter's number of extraction
+        processes; 1 always extracts in this process.
+        """
+        if engine not in ('fitz', 'pdfplumber'):
+            raise ValueError(f"Unknown PDF text engine: {engine}")
+        return self._iter_pages(pdf_path, engine, workers, pages, max_pages)
+    
+    def iter_page_layout(self, pdf_path, workers=None, pages=None, max_pages=None):
+        """Yield the text blocks (see page_layouts) of each selected page in order"""
+        return self._iter_pages(pdf_path, 'layout', workers, pages, max_pages)
+    
+    def _iter_pages(self, pdf_path, engine, workers, pages, max_pages):
+        workers = self.workers if workers is None else workers
+        
+        # The page count comes from the cross-reference table; no page is
+        # parsed to get it
+        with fitz.open(pdf_path) as doc:
+            selected = select_pages(doc.page_count, pages, max_pages)
+        
+        def extract(missing, source=engine):
+            if workers > 1 and len(missing) >= self.parallel_min_pages[engine]:
+                return self._iter_parallel(pdf_path, source, missing, workers)
+            return page_results(pdf_path, source, missing)
+        
+        if self.page_cache is None:
+            return extract(selected)
+        if engine == 'layout':
+            # The layout pass yields the plain text for little extra cost,
+            # and both are cached, so a later TXT conversion of the same
+            # PDF parses nothing. Text-only extraction doesn't build the
+            # layout: it is much cheaper without it
+            return self._iter_cached(pdf_path, ('text:fitz', 'layout'), 1, selected,
+                                     lambda missing: extract(missing, 'fitz+layout'))
+        return self._iter_cached(pdf_path, (f"text:{engine}",), 0, selected,
+                                 lambda missing: ([value] for value in extract(missing)))
+    
+    def _iter_cached(self, pdf_path, kinds, wanted, pages, extract):
+        # ``extract`` yields one value per kind for each page; the wanted
+        # kind is returned and all of them are stored. Pages found in the
+        # cache are read back; the others are extracted in one pass (so a
+        # large remainder still goes parallel) and stored in batches as
+        # they arrive. The uploaded file's hash is usually known already
+        # (see FileHasher.remember_hash)
+        kind = kinds[wanted]
+        document = FileHasher.get_cached_hash(pdf_path)
+        cached = self.page_cache.cached_pages(document, kind)
+        missing = [page for page in pages if page not in cached]
+        extracted = extract(missing) if missing else iter(())
+        fresh = {}
         try:
-            # Extract text from PDF
-            text_content = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content += page_text + "\n\n"
-            
-            # Create DOCX document
-            doc = Document()
-            
-            # Split text into paragraphs and add to document
-            paragraphs = text_content.split('\n\n')
-            for paragraph in paragraphs:
-                if paragraph.strip():
-                    doc.add_paragraph(paragraph.strip())
+            for start in range(0, len(pages), CACHE_BATCH_PAGES):
+                batch = pages[start:start + CACHE_BATCH_PAGES]
+                values = self.page_cache.get(document, kind,
+                                             [page for page in batch if page in cached])
+                for page in batch:
+                    if page in values:
+                        yield values[page]
+                        continue
+                    if page in cached:
+                        # Evicted by another process since the lookup
+                        [values_of_page] = extract([page])
+                    else:
+                        values_of_page = next(extracted)
+                    fresh[page] = values_of_page
+                    if len(fresh) >= CACHE_BATCH_PAGES:
+                        self._store(document, kinds, fresh)
+                        fresh = {}
+                    yield values_of_page[wanted]
+        finally:
+            # Also reached when the caller stops reading early: keep what
+            # was extracted and stop the extraction
+            if fresh:
+                self._store(document, kinds, fresh)
+            if hasattr(extracted, 'close'):
+                extracted.close()
+    
+    def _store(self, document, kinds, fresh):
+        for index, kind in enumerate(kinds):
+            self.page_cache.put(document, kind,
+                                {page: values[index] for page, values in fresh.items()})
+    
+    def _iter_parallel(self, pdf_path, engine, pages, workers):
+        # A few runs per worker evens out pages of uneven cost; only a
+        # couple of runs per worker are in flight, so memory stays bounded
+        # however far ahead the workers get
+        size = max(math.ceil(len(pages) / (workers * 4)), 1)
+        runs = (pages[start:start + size] for start in range(0, len(pages), size))
+        
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            pending = collections.deque(pool.submit(extract_pages, pdf_path, engine, run)
+                                        for run in itertools.islice(runs, workers * 2))
+            while pending:
+                texts = pending.popleft().result()
+                for run in itertools.islice(runs, 1):
+                    pending.append(pool.submit(extract_pages, pdf_path, engine, run))
+                yield from texts
+        finally:
+            # Also reached when the caller stops reading early: drop the
+            # queued runs and let the running ones finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def pdf_to_docx(self, pdf_path, output_path, engine='layout', workers=None, pages=None,
+                    max_pages=None):
+        """Convert PDF to DOCX, writing it out a page at a time
+        
+        The ``layout`` engine keeps headings and simple tables; ``fitz``
+        and ``pdfplumber`` write the text of each page as paragraphs.
+        """
+        try:
+            with DocxWriter(output_path) as writer:
+                if engine == 'layout':
+                    self._write_layout(writer, pdf_path, workers, pages, max_pages)
+                else:
+                    for page_text in self.iter_page_text(pdf_path, engine, workers, pages,
+                                                         max_pages):
+                        for paragraph in (page_text or '').split('\n\n'):
+                            if paragraph.strip():
+                                writer.add_paragraph(paragraph.strip())
             
-            doc.save(output_path)
             return output_path
             
         except Exception as e:
             raise Exception(f"PDF to DOCX conversion failed: {str(e)}")
     
-    def pdf_to_audio(self, pdf_path, output_path):
+    def _write_layout(self, writer, pdf_path, workers, pages, max_pages):
+        # Headings stand out from the body text, whose size is the most
+        # common one in the pages read so far. Consecutive rows with the
+        # same number of cells form a table, which may run across pages
+        sizes = collections.Counter()
+        table = []
+        
+        def flush_table():
+            if len(table) > 1:
+                writer.add_table(table)
+            elif table:
+                writer.add_paragraph(' '.join(table[0]))
+            table.clear()
+        
+        for blocks in self.iter_page_layout(pdf_path, workers, pages, max_pages):
+            for size, _, rows in blocks:
+                sizes[size] += sum(len(text) for row in rows for _, text in row)
+            body_size = sizes.most_common(1)[0][0] if sizes else None
+            
+            for size, bold, rows in blocks:
+                if all(len(row) > 1 for row in rows):
+                    for row in rows:
+                        if table and len(row) != len(table[0]):
+                            flush_table()
+                        table.append([text for _, text in row])
+                    continue
+                
+                flush_table()
+                text = join_lines([' '.join(text for _, text in row) for row in rows])
+                level = heading_level(size, bold, text, len(rows), body_size)
+                if level:
+                    writer.add_heading(text, level)
+                else:
+                    writer.add_paragraph(text)
+        flush_table()
+    
+    def pdf_to_audio(self, pdf_path, output_path, engine='fitz', workers=1, pages=None,
+                     max_pages=None):
         """Convert PDF to audio using text-to-speech"""
         try:
-            # Extract text from PDF
-            text_content = ""
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content += page_text + " "
+            # Extract text from PDF, only as far as gTTS will read
+            # (max ~5000 characters per request). That is a few pages at
+            # most, so they are extracted in this process: parallel
+            # extraction would start on half the document up front
+            parts = []
+            length = 0
+            for page_text in self.iter_page_text(pdf_path, engine, workers, pages, max_pages):
+                if page_text:
+                    parts.append(page_text + " ")
+                    length += len(page_text) + 1
+                if length > 4500:
+                    break
+            text_content = "".join(parts)
             
             if not text_content.strip():
                 raise Exception("No text found in PDF")
             
-            # Limit text length for gTTS (max ~5000 characters per request)
             if len(text_content) > 4500:
                 text_content = text_content[:4500] + "..."
             
@@ -81,29 +389,43 @@ class PDFConverter:
         except Exception as e:
             raise Exception(f"PDF to Audio conversion failed: {str(e)}")
     
-    def extract_images_from_pdf(self, pdf_path, output_dir):
-        """Extract images from PDF"""
+    def pdf_to_images(self, pdf_path, output_path, pages=None, max_pages=None):
+        """Extract the images of the selected pages into a ZIP of PNG files"""
         try:
-            doc = fitz.open(pdf_path)
-            image_paths = []
+            count = 0
+            # PNG data is already compressed
+            with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_STORED) as archive:
+                for page_num, img_index, pix in self._iter_images(pdf_path, pages, max_pages):
+                    # Numbered from 1, like the ``pages`` selection
+                    archive.writestr(f"page{page_num + 1}_{img_index + 1}.png", pix.tobytes('png'))
+                    count += 1
             
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                image_list = page.get_images()
-                
-                for img_index, img in enumerate(image_list):
-                    xref = img[0]
-                    pix = fitz.Pixmap(doc, xref)
-                    
-                    if pix.n - pix.alpha < 4:  # GRAY or RGB
-                        img_path = os.path.join(output_dir, f"image_p{page_num}_{img_index}.png")
-                        pix.save(img_path)
-                        image_paths.append(img_path)
-                    
-                    pix = None
+            if not count:
+                raise ValueError("No images found in the selected pages")
+            return output_path
             
-            doc.close()
+        except Exception as e:
+            raise Exception(f"PDF to images conversion failed: {str(e)}")
+    
+    def extract_images_from_pdf(self, pdf_path, output_dir, pages=None, max_pages=None):
+        """Extract images from PDF, from the selected pages only"""
+        try:
+            image_paths = []
+            for page_num, img_index, pix in self._iter_images(pdf_path, pages, max_pages):
+                img_path = os.path.join(output_dir, f"image_p{page_num}_{img_index}.png")
+                pix.save(img_path)
+                image_paths.append(img_path)
             return image_paths
             
         except Exception as e:
-            raise Exception(f"Image extraction failed: {str(e)}")
\ No newline at end of file
+            raise Exception(f"Image extraction failed: {str(e)}")
+    
+    def _iter_images(self, pdf_path, pages, max_pages):
+        # Yields (page, index on the page, pixmap) of each GRAY or RGB image
+        with fitz.open(pdf_path) as doc:
+            for page_num in select_pages(doc.page_count, pages, max_pages):
+                page = doc.load_page(page_num)
+                for img_index, img in enumerate(page.get_images()):
+                    pix = fitz.Pixmap(doc, img[0])
+                    if pix.n - pix.alpha < 4:
+                        yield page_num, img_index, pix
@@ -0,0 +1,77 @@
+import threading
+
+
+class DurationPredictor:
+    """Learn how long each conversion type takes from the jobs that ran
+
+    For every conversion type, duration is modelled as ``intercept +
+    slope * units``. Units are the work measure of the input type (pages,
+    megapixels, seconds of audio or megabytes; see ``admission.measure``).
+    The fit is an online least-squares regression, and older observations
+    decay so the model follows changes in load or code. Until a type has
+    a few observations, its prediction leans on the ``prior`` the caller
+    passes in.
+    """
+
+    def __init__(self, decay=0.98, prior_weight=3.0, minimum=0.01):
+        self.decay = decay
+        self.prior_weight = prior_weight  # Observations the prior is worth
+        self.minimum = minimum
+        self.models = {}  # conversion type -> [weight, sx, sy, sxx, sxy]
+        self.lock = threading.Lock()
+
+    def observe(self, conversion_type, units, duration):
+        """Add the measured duration of one conversion"""
+        with self.lock:
+            model = self.models.setdefault(conversion_type, [0.0] * 5)
+            for index in range(5):
+                model[index] *= self.decay
+            model[0] += 1
+            model[1] += units
+            model[2] += duration
+            model[3] += units * units
+            model[4] += units * duration
+
+    def predict(self, conversion_type, units, prior=None):
+        """Expected duration in seconds of converting ``units`` of input"""
+        with self.lock:
+            model = self.models.get(conversion_type)
+            fitted = self._fit(model) if model else None
+
+        if fitted is None:
+            estimate = prior
+        else:
+            intercept, slope = fitted
+            estimate = intercept + slope * units
+            if prior is not None:
+                # Blend towards the fit as observations accumulate
+                weight = model[0] / (model[0] + self.prior_weight)
+                estimate = weight * estimate + (1 - weight) * prior
+        return max(estimate if estimate is not None else self.minimum, self.minimum)
+
+    def get_stats(self):
+        with self.lock:
+            stats = {}
+            for conversion_type, model in self.models.items():
+                intercept, slope = self._fit(model)
+                stats[conversion_type] = {
+                    'weight': round(model[0], 2),
+                    'intercept': round(intercept, 4),
+                    'seconds_per_unit': round(slope, 6)
+                }
+            return stats
+
+    @staticmethod
+    def _fit(model):
+        weight, sx, sy, sxx, sxy = model
+        denominator = weight * sxx - sx * sx
+        slope = (weight * sxy - sx * sy) / denominator if denominator > 1e-9 * weight * sxx else 0.0
+
+        # Durations never shrink with larger inputs, nor go below zero
+        if slope < 0:
+            slope = 0.0
+        intercept = (sy - slope * sx) / weight
+        if intercept < 0:
+            intercept = 0.0
+            slope = sxy / sxx if sxx > 0 else 0.0
+        return intercept, slope
@@ -0,0 +1,230 @@
+import io
+import re
+import json
+import struct
+import subprocess
+
+
+class HeaderCapture:
+    """Upload sink that keeps only the first ``limit`` bytes of a file part
+
+    Handed to the multipart parser for /api/file_info: the rest of the
+    part is counted and dropped, so probing a file never writes it to disk
+    or holds more than ``limit`` bytes in memory.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.size = 0
+        self._buffer = io.BytesIO()
+
+    @property
+    def header(self):
+        return self._buffer.getvalue()
+
+    @property
+    def complete(self):
+        """Whether the whole part fitted in the captured header"""
+        return self.size <= self.limit
+
+    def write(self, data):
+        kept = self.limit - self._buffer.tell()
+        if kept > 0:
+            self._buffer.write(data[:kept])
+        self.size += len(data)
+        return len(data)
+
+    def seek(self, offset, whence=0):
+        return self._buffer.seek(offset, whence)
+
+    def tell(self):
+        return self._buffer.tell()
+
+    def read(self, size=-1):
+        return self._buffer.read(size)
+
+    def close(self):
+        self._buffer.close()
+
+
+def probe(header, file_size=None, ffprobe=None, timeout=5):
+    """Describe a file from its first bytes
+
+    Returns a dict with the ``format`` found by magic bytes and whatever
+    the headers give away: ``page_count`` for PDFs (PyMuPDF), ``width``
+    and ``height`` for images (Pillow), ``duration`` and ``streams``
+    (codec, size, sample rate, channels) for WAV. Other audio and video
+    is described by ``ffprobe`` (the path of the binary) fed the header;
+    without it only the format is named. Values from a truncated header
+    that may be off (a duration derived from the bit rate, say) come
+    with ``estimated`` set.
+    """
+    if file_size is None:
+        file_size = len(header)
+    complete = len(header) >= file_size
+
+    for matches, parse in PROBES:
+        if matches(header):
+            try:
+                info = parse(header, file_size, complete)
+            except Exception:
+                info = None
+            break
+    else:
+        info = None
+
+    if ffprobe and (info is None or 'streams' in info and info.get('duration') is None):
+        info = _ffprobe(ffprobe, header, file_size, complete, timeout) or info
+    return info or {'format': _media_format(header)}
+
+
+def _probe_pdf(header, file_size, complete):
+    info = {'format': 'pdf', 'page_count': None}
+    version = re.search(rb'%PDF-(\d\.\d)', header[:1024])
+    if version:
+        info['version'] = version.group(1).decode()
+
+    if complete:
+        import fitz
+        with fitz.open(stream=header, filetype='pdf') as document:
+            info['page_count'] = document.page_count
+            info['encrypted'] = bool(document.needs_pass)
+        return info
+
+    # A linearized PDF states its page count in the first object;
+    # otherwise the root of the page tree has the largest /Count
+    linearized = re.search(rb'/Linearized\b[^>]*?/N\s+(\d+)', header[:4096])
+    if linearized:
+        info['page_count'] = int(linearized.group(1))
+        return info
+
+    counts = [int(count) for count in
+              re.findall(rb'/Type\s*/Pages\b[^>]*?/Count\s+(\d+)', header) +
+              re.findall(rb'/Count\s+(\d+)[^>]*?/Type\s*/Pages\b', header)]
+    if counts:
+        info['page_count'] = max(counts)
+        info['estimated'] = True
+    info['encrypted'] = b'/Encrypt' in header
+    return info
+
+
+def _probe_image(header, file_size, complete):
+    from PIL import Image
+
+    # Image.open only parses the header; pixel data is never decoded
+    with Image.open(io.BytesIO(header)) as image:
+        width, height = image.size
+        return {
+            'format': image.format.lower(),
+            'width': width,
+            'height': height,
+            'mode': image.mode,
+            'megapixels': round(width * height / 1e6, 2)
+        }
+
+
+def _riff_chunks(data, start, end):
+    offset = start
+    while offset + 8 <= end:
+        chunk_id, size = struct.unpack('<4sI', data[offset:offset + 8])
+        yield chunk_id, offset + 8, min(offset + 8 + size, end), size
+        offset += 8 + size + (size & 1)
+
+
+WAVE_CODECS = {1: 'pcm', 3: 'pcm_float', 6: 'pcm_alaw', 7: 'pcm_mulaw', 0x55: 'mp3',
+               0xFFFE: 'pcm'}
+
+
+def _probe_wav(header, file_size, complete):
+    info = {'format': 'wav', 'duration': None, 'streams': []}
+    byte_rate = None
+    for chunk_id, start, end, size in _riff_chunks(header, 12, len(header)):
+        if chunk_id == b'fmt ':
+            codec, channels, sample_rate, byte_rate = struct.unpack('<HHII', header[start:start + 12])
+            bits = struct.unpack('<H', header[start + 14:start + 16])[0]
+            info['streams'].append({
+                'type': 'audio',
+                'codec': WAVE_CODECS.get(codec, f'0x{codec:04x}'),
+                'sample_rate': sample_rate,
+                'channels': channels,
+                'bits_per_sample': bits
+            })
+        elif chunk_id == b'data' and byte_rate:
+            # Streamed WAVs leave the data size at 0 or 0xFFFFFFFF
+            if size in (0, 0xFFFFFFFF):
+                size = file_size - start
+                info['estimated'] = True
+            info['duration'] = size / byte_rate
+            break
+    return info
+
+
+def _ffprobe(ffprobe, header, file_size, complete, timeout):
+    """Ask ffprobe about the header, fed through a pipe"""
+    try:
+        result = subprocess.run(
+            [ffprobe, '-v', 'quiet', '-print_format', 'json', '-show_format', '-show_streams',
+             '-i', 'pipe:0'],
+            input=header, capture_output=True, timeout=timeout
+        )
+        data = json.loads(result.stdout or b'{}')
+    except (OSError, ValueError, subprocess.SubprocessError):
+        return None
+    if 'format' not in data:
+        return None
+
+    format_info = data['format']
+    info = {'format': format_info.get('format_name', '').split(',')[0], 'duration': None,
+            'streams': []}
+    bit_rate = format_info.get('bit_rate')
+    if bit_rate:
+        info['bit_rate'] = int(bit_rate)
+
+    # From a truncated pipe ffprobe derives the duration from the bytes it
+    # was given; scale by the real size instead
+    if complete and format_info.get('duration'):
+        info['duration'] = float(format_info['duration'])
+    elif bit_rate:
+        info['duration'] = file_size * 8 / int(bit_rate)
+        info['estimated'] = True
+
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') not in ('audio', 'video'):
+            continue
+        entry = {'type': stream['codec_type'], 'codec': stream.get('codec_name')}
+        for key in ('width', 'height', 'channels'):
+            if stream.get(key):
+                entry[key] = stream[key]
+        if stream.get('sample_rate'):
+            entry['sample_rate'] = int(stream['sample_rate'])
+        info['streams'].append(entry)
+    return info
+
+
+def _media_format(header):
+    for signature, offset, name in MEDIA_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return name
+    # An MPEG audio frame sync; layer bits of 0 mean ADTS (AAC)
+    if len(header) > 1 and header[0] == 0xFF and header[1] & 0xE0 == 0xE0:
+        return 'aac' if header[1] & 0x06 == 0 else 'mp3'
+    return None
+
+
+IMAGE_SIGNATURES = (b'\xff\xd8\xff', b'\x89PNG\r\n\x1a\n', b'GIF87a', b'GIF89a', b'BM',
+                    b'II*\x00', b'MM\x00*')
+
+# Formats named by magic bytes alone when ffprobe can't describe them:
+# (signature, offset, format)
+MEDIA_SIGNATURES = (
+    (b'AVI ', 8, 'avi'), (b'ID3', 0, 'mp3'), (b'fLaC', 0, 'flac'), (b'OggS', 0, 'ogg'),
+    (b'ftyp', 4, 'mp4'), (b'moov', 4, 'mov'), (b'\x1a\x45\xdf\xa3', 0, 'matroska'),
+    (b'FLV', 0, 'flv'), (b'\x30\x26\xb2\x75', 0, 'asf')
+)
+
+# Checked in order against the first bytes of the file
+PROBES = (
+    (lambda header: b'%PDF-' in header[:1024], _probe_pdf),
+    (lambda header: header.startswith(IMAGE_SIGNATURES), _probe_image),
+    (lambda header: header[:4] == b'RIFF' and header[8:12] == b'WAVE', _probe_wav)
+)
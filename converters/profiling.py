@@ -0,0 +1,119 @@
+import os
+import io
+import time
+import random
+import pstats
+import cProfile
+import threading
+import tracemalloc
+
+
+class ConversionProfiler:
+    """Profile sampled conversions with cProfile and tracemalloc
+
+    A profiled call leaves two files in ``profile_dir``, named after its
+    profile id (the job id): ``<id>.pstats`` for ``pstats``/snakeviz and
+    ``<id>.allocations.txt`` with the top allocation sites (sampled near
+    the memory peak) and the hottest functions. ``sample_rate`` picks a
+    share of conversions to profile, so it can stay on under real
+    traffic; a request can also force profiling. tracemalloc traces the
+    whole process, so one conversion per process is profiled at a time
+    and the others run untouched.
+    """
+
+    def __init__(self, profile_dir='profiles', sample_rate=0.0, top=25, frames=5,
+                 poll_interval=0.05):
+        self.profile_dir = profile_dir
+        self.sample_rate = sample_rate
+        self.top = top
+        self.frames = frames
+        self.poll_interval = poll_interval
+        self.lock = threading.Lock()
+
+    def should_profile(self, forced=False):
+        """Decide whether to profile the next conversion"""
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def run(self, profile_id, func, *args, **kwargs):
+        """Call ``func`` under the profilers and return ``(result, profile)``
+
+        ``profile`` holds the paths of the saved files, or is None when
+        another conversion in this process is already being profiled.
+        """
+        if not self.lock.acquire(blocking=False):
+            return func(*args, **kwargs), None
+
+        try:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start(self.frames)
+            tracemalloc.reset_peak()
+            profiler = cProfile.Profile()
+
+            # Memory is mostly freed by the time the conversion returns, so
+            # snapshot whenever traced memory grows past the last snapshot
+            largest = {'snapshot': None, 'size': 0}
+            stop = threading.Event()
+
+            def watch():
+                while not stop.wait(self.poll_interval):
+                    current, _ = tracemalloc.get_traced_memory()
+                    if current > largest['size'] * 1.1:
+                        largest['snapshot'], largest['size'] = tracemalloc.take_snapshot(), current
+
+            watcher = threading.Thread(target=watch, name='profile-memory', daemon=True)
+            watcher.start()
+
+            start_time = time.time()
+            profiler.enable()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                duration = time.time() - start_time
+                stop.set()
+                watcher.join()
+                current, peak = tracemalloc.get_traced_memory()
+                if current >= largest['size']:
+                    largest['snapshot'], largest['size'] = tracemalloc.take_snapshot(), current
+                if started_tracing:
+                    tracemalloc.stop()
+
+            profile = self._save(profile_id, profiler, largest['snapshot'], largest['size'],
+                                 duration, peak)
+            return result, profile
+        finally:
+            self.lock.release()
+
+    def _save(self, profile_id, profiler, snapshot, sampled, duration, peak):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stats_path = os.path.join(self.profile_dir, f"{profile_id}.pstats")
+        allocations_path = os.path.join(self.profile_dir, f"{profile_id}.allocations.txt")
+
+        profiler.dump_stats(stats_path)
+
+        snapshot = snapshot.filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>')
+        ))
+
+        with open(allocations_path, 'w', encoding='utf-8') as report:
+            report.write(f"profile: {profile_id}\n")
+            report.write(f"duration: {duration:.3f} s\n")
+            report.write(f"traced memory: {peak / 1024 / 1024:.1f} MB peak\n\n")
+
+            report.write(f"Top {self.top} allocation sites "
+                         f"(snapshot at {sampled / 1024 / 1024:.1f} MB)\n")
+            for statistic in snapshot.statistics('traceback')[:self.top]:
+                report.write(f"{statistic.size / 1024:10.1f} KiB  {statistic.count:8d} blocks\n")
+                for line in statistic.traceback.format(most_recent_first=True):
+                    report.write(f"    {line}\n")
+
+            report.write(f"\nTop {self.top} functions by cumulative time\n")
+            buffer = io.StringIO()
+            pstats.Stats(profiler, stream=buffer).sort_stats('cumulative').print_stats(self.top)
+            report.write(buffer.getvalue())
+
+        return {'stats': stats_path, 'allocations': allocations_path}
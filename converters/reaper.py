@@ -0,0 +1,191 @@
+import os
+import time
+import heapq
+import shutil
+import threading
+from datetime import timedelta
+
+
+class ExpiryReaper:
+    """Delete uploads, temp files and outputs once they expire
+
+    Every tracked path sits in a min-heap keyed by its expiry time, so a
+    reap pops only entries that are already due and its cost depends on
+    how many files expire, not on how many files exist. A background
+    thread reaps at most ``batch_size`` entries per tick. Files left over
+    from earlier processes are picked up by ``watch``, which scans a
+    folder a batch at a time on the same ticks.
+    """
+
+    def __init__(self, lifetime=timedelta(hours=1), interval=30, batch_size=200):
+        self.lifetime = lifetime.total_seconds() if isinstance(lifetime, timedelta) else lifetime
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.heap = []
+        self.entries = {}  # path -> (expires_at, kind) of the live heap entry
+        self.scans = []
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.scan_lock = threading.Lock()
+        self._pid = None
+        self._wakeup = None
+
+    def track(self, path, kind='file', lifetime=None, expires_at=None):
+        """Schedule ``path`` for deletion ``lifetime`` seconds from now"""
+        if expires_at is None:
+            expires_at = time.time() + (self.lifetime if lifetime is None else lifetime)
+
+        with self.lock:
+            # Re-tracking supersedes the old heap entry, which is skipped when popped
+            self.entries[path] = (expires_at, kind)
+            heapq.heappush(self.heap, (expires_at, path))
+        self.start()
+
+    def untrack(self, path):
+        """Stop tracking a path that was removed or handed elsewhere"""
+        with self.lock:
+            self.entries.pop(path, None)
+
+    def add_listener(self, listener):
+        """Register ``listener(path, kind)``, called after a path is reaped"""
+        self.listeners.append(listener)
+
+    def watch(self, directory, kind='file', recursive=False):
+        """Track the files already in ``directory``, scanning it incrementally
+
+        The scan runs on the reaper thread, which starts with the first
+        ``track`` (or ``start``) call in the process. With ``recursive``
+        the files in its subfolders are tracked too; the folders stay.
+        """
+        with self.lock:
+            self.scans.append((directory, kind, None, recursive))
+
+    def finish_scans(self):
+        """Run the pending folder scans to the end, so every file is tracked"""
+        while True:
+            with self.lock:
+                if not self.scans:
+                    return
+            self._scan_step(self.batch_size)
+
+    def reap(self, now=None, limit=None):
+        """Delete due entries, looking at no more than ``limit`` of them
+
+        Returns the number of deleted paths per kind.
+        """
+        now = time.time() if now is None else now
+        limit = self.batch_size if limit is None else limit
+        removed = {}
+
+        for _ in range(limit):
+            with self.lock:
+                if not self.heap or self.heap[0][0] > now:
+                    break
+                expires_at, path = heapq.heappop(self.heap)
+                entry = self.entries.get(path)
+                if entry is None or entry[0] != expires_at:
+                    continue
+                del self.entries[path]
+
+            kind = entry[1]
+            if self._remove(path):
+                removed[kind] = removed.get(kind, 0) + 1
+            for listener in self.listeners:
+                listener(path, kind)
+
+        return removed
+
+    def get_stats(self):
+        with self.lock:
+            next_expiry = self.heap[0][0] if self.heap else None
+            return {
+                'tracked': len(self.entries),
+                'heap_size': len(self.heap),
+                'next_expiry': next_expiry,
+                'scanning': len(self.scans)
+            }
+
+    def _scan_step(self, limit):
+        """Feed up to ``limit`` entries of pending folder scans into the heap"""
+        # One scanner at a time: the reaper thread and finish_scans share
+        # the open directory iterators
+        with self.scan_lock:
+            with self.lock:
+                if not self.scans:
+                    return 0
+                directory, kind, iterator, recursive = self.scans[0]
+
+            if iterator is None:
+                try:
+                    iterator = os.scandir(directory)
+                except OSError:
+                    iterator = iter(())
+
+            seen = 0
+            finished = True
+            for entry in iterator:
+                seen += 1
+                try:
+                    if entry.is_file(follow_symlinks=False) and entry.path not in self.entries:
+                        self.track(entry.path, kind,
+                                   expires_at=entry.stat().st_mtime + self.lifetime)
+                    elif recursive and entry.is_dir(follow_symlinks=False):
+                        with self.lock:
+                            self.scans.append((entry.path, kind, None, True))
+                except OSError:
+                    pass
+                if seen >= limit:
+                    finished = False
+                    break
+
+            with self.lock:
+                self.scans.pop(0)
+                if finished:
+                    if hasattr(iterator, 'close'):
+                        iterator.close()
+                else:
+                    self.scans.insert(0, (directory, kind, iterator, recursive))
+            return seen
+
+    def _loop(self):
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self._scan_step(self.batch_size)
+                removed = self.reap()
+            except Exception:
+                continue
+
+            # Catch up on a backlog with more short ticks instead of one long one
+            if sum(removed.values()) >= self.batch_size or self.scans:
+                self._wakeup.set()
+                time.sleep(0.1)
+
+    def start(self):
+        """Start this process's reaper thread if it isn't running"""
+        # One thread per process, started on first use: it does not survive
+        # a fork, and conversion pool processes never need one
+        if self._pid == os.getpid():
+            return
+
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self._wakeup = threading.Event()
+            thread = threading.Thread(target=self._loop, name='expiry-reaper', daemon=True)
+            self._pid = os.getpid()
+            thread.start()
+
+    @staticmethod
+    def _remove(path):
+        try:
+            if os.path.isdir(path) and not os.path.islink(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            return True
+        except OSError:
+            # Already gone (e.g. consumed by the conversion) or not removable
+            return False
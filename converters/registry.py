@@ -0,0 +1,82 @@
+import shutil
+import importlib
+import threading
+
+
+class ConverterRegistry:
+    """Converters built once per process and shared between threads
+
+    Each converter is created on first use and kept for the life of the
+    process, so per-job work no longer includes constructing recognizers,
+    TTS engines or searching the PATH for ffmpeg. Capability probes run
+    once and are cached. Converter modules (and their heavy dependencies)
+    are only imported when their first job arrives.
+    """
+
+    # (module, class) of the converter for each input type; types sharing a
+    # class share one instance
+    CONVERTERS = {
+        'pdf': ('pdf_converter', 'PDFConverter'),
+        'document': ('text_converter', 'TextConverter'),
+        'image': ('image_converter', 'ImageConverter'),
+        'audio': ('audio_converter', 'AudioConverter'),
+        'video': ('audio_converter', 'AudioConverter')
+    }
+
+    def __init__(self, settings=None):
+        self.settings = settings or {}  # Converter class name -> constructor keywords
+        self.lock = threading.RLock()
+        self.instances = {}
+        self._capabilities = None
+
+    def get(self, input_type):
+        """Get the shared converter for an input type"""
+        spec = self.CONVERTERS.get(input_type)
+        if spec is None:
+            raise Exception(f"No converter available for {input_type} files")
+
+        with self.lock:
+            converter = self.instances.get(spec)
+            if converter is None:
+                converter = self.instances[spec] = self._build(*spec)
+        return converter
+
+    def warm(self):
+        """Build every converter and run the capability probes now"""
+        for input_type in self.CONVERTERS:
+            self.get(input_type)
+        return self.get_capabilities()
+
+    def get_capabilities(self):
+        """Get the external tools available to the converters"""
+        with self.lock:
+            if self._capabilities is None:
+                self._capabilities = self._probe()
+            return self._capabilities
+
+    def _build(self, module_name, class_name):
+        module = importlib.import_module(f'.{module_name}', __package__)
+        converter_class = getattr(module, class_name)
+        kwargs = dict(self.settings.get(class_name, {}))
+        if class_name == 'AudioConverter':
+            kwargs['ffmpeg_available'] = self.get_capabilities()['ffmpeg']['available']
+        return converter_class(**kwargs)
+
+    @staticmethod
+    def _probe():
+        capabilities = {}
+        for tool in ('ffmpeg', 'ffprobe'):
+            path = shutil.which(tool)
+            capabilities[tool] = {'available': path is not None, 'path': path}
+
+        tesseract = {'available': False, 'version': None, 'languages': []}
+        try:
+            import pytesseract
+            tesseract['version'] = str(pytesseract.get_tesseract_version())
+            tesseract['languages'] = sorted(pytesseract.get_languages(config=''))
+            tesseract['available'] = True
+        except Exception:
+            pass
+        capabilities['tesseract'] = tesseract
+
+        return capabilities
@@ -0,0 +1,139 @@
+import os
+import atexit
+import logging
+import sqlite3
+import threading
+from .storage import SQLiteStore
+
+logger = logging.getLogger(__name__)
+
+
+class StatsStore(SQLiteStore):
+    """Counter store shared by every worker process through SQLite
+
+    Increments are added to an in-memory buffer (a dict update under a
+    lock), so recording a stat never touches the disk on the conversion
+    path. A background thread flushes the buffer as one upsert transaction
+    every ``flush_interval`` seconds, or sooner once ``max_pending``
+    increments have piled up. The database runs in WAL mode so flushes
+    from several gunicorn workers and readers don't block each other.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS counters (
+            name TEXT NOT NULL,
+            label TEXT NOT NULL DEFAULT '',
+            value INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (name, label)
+        )
+    """
+
+    def __init__(self, db_path, flush_interval=1.0, max_pending=1000):
+        super().__init__(db_path)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.pending_count = 0
+
+        self._pid = None
+        self._wakeup = None
+        self._flusher = None
+
+    def add(self, name, amount=1, label=''):
+        """Buffer an increment of counter ``name``"""
+        self._ensure_started()
+        key = (name, label)
+        with self.lock:
+            self.pending[key] = self.pending.get(key, 0) + amount
+            self.pending_count += 1
+            flush_now = self.pending_count >= self.max_pending
+
+        if flush_now:
+            self._wakeup.set()
+
+    def flush(self):
+        """Write buffered increments to the database"""
+        with self.lock:
+            pending = self.pending
+            self.pending = {}
+            self.pending_count = 0
+
+        if not pending:
+            return
+
+        try:
+            with self.db_lock:
+                conn = self._get_connection()
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO counters (name, label, value) VALUES (?, ?, ?) "
+                        "ON CONFLICT (name, label) DO UPDATE SET value = value + excluded.value",
+                        [(name, label, value) for (name, label), value in pending.items()]
+                    )
+        except sqlite3.Error:
+            # Keep the increments for the next attempt (e.g. database locked)
+            with self.lock:
+                for key, value in pending.items():
+                    self.pending[key] = self.pending.get(key, 0) + value
+                    self.pending_count += 1
+            raise
+
+    def get_counters(self):
+        """Get the totals of all workers as ``{(name, label): value}``
+
+        If this process's buffered increments can't be written right now
+        (e.g. the database is locked), the totals already written are
+        returned and the increments wait for the next flush.
+        """
+        try:
+            self.flush()
+        except sqlite3.Error as e:
+            logger.warning(f"Stats flush failed, reporting stored counters: {str(e)}")
+        with self.db_lock:
+            rows = self._get_connection().execute(
+                "SELECT name, label, value FROM counters"
+            ).fetchall()
+        return {(name, label): value for name, label, value in rows}
+
+    def close(self):
+        if self._pid != os.getpid():
+            return
+        try:
+            self.flush()
+        except sqlite3.Error:
+            pass
+        super().close()
+
+    def _ensure_started(self):
+        # The flusher thread doesn't survive a fork, so each process (e.g.
+        # gunicorn workers forked from a preloaded app) starts its own on
+        # first use
+        if self._pid == os.getpid():
+            return
+
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self.pending = {}
+            self.pending_count = 0
+            self._wakeup = threading.Event()
+            self._flusher = threading.Thread(target=self._flush_loop, name='stats-flusher',
+                                             daemon=True)
+            self._pid = os.getpid()
+            self._flusher.start()
+            atexit.register(self.close)
+
+    def _flush_loop(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except sqlite3.Error:
+                continue
+
+    def _get_connection(self):
+        self._ensure_started()
+        return super()._get_connection()
@@ -0,0 +1,85 @@
+import os
+import atexit
+import sqlite3
+import threading
+
+
+class SizeBudget:
+    """Approximate size of a store against its byte budget
+
+    Added sizes are tracked in memory, and the store is only measured
+    (by ``evict``, which reports the measured size back through
+    ``measured``) when this process has no estimate yet or the estimate
+    crosses ``max_size``. Other processes' writes are picked up at that
+    point. The estimate is dropped on fork, so each process measures the
+    store on its first write.
+    """
+
+    def __init__(self, max_size, evict):
+        self.max_size = max_size
+        self.evict = evict
+        self.lock = threading.Lock()
+        self._size = None
+        self._pid = None
+
+    def add(self, added_size):
+        """Account for ``added_size`` new bytes, evicting if over budget"""
+        with self.lock:
+            if self._size is None or self._pid != os.getpid():
+                needs_scan = True
+            else:
+                self._size += added_size
+                needs_scan = self._size > self.max_size
+
+        if needs_scan:
+            self.evict()
+
+    def measured(self, total_size):
+        """Record the store's actual size"""
+        with self.lock:
+            self._size = total_size
+            self._pid = os.getpid()
+
+
+class SQLiteStore:
+    """Base of stores kept in a SQLite database shared by every worker process
+
+    Each process opens its own connection on first use, since
+    connections don't survive a fork (e.g. gunicorn workers or pool
+    processes), and closes it at exit. The database runs in WAL mode so
+    several processes can read and write it at once. Subclasses set
+    ``SCHEMA`` and hold ``db_lock`` while using the connection.
+    """
+
+    SCHEMA = None
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.db_lock = threading.Lock()
+        self._conn_pid = None
+        self._conn = None
+
+    def close(self):
+        if self._conn_pid != os.getpid():
+            return
+        with self.db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _get_connection(self):
+        if self._conn_pid != os.getpid():
+            self._conn = None
+            self._conn_pid = os.getpid()
+            atexit.register(self.close)
+
+        if self._conn is None:
+            directory = os.path.dirname(self.db_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(self.SCHEMA)
+            self._conn = conn
+        return self._conn
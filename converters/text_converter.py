@@ -3,17 +3,31 @@ import pyttsx3
 from docx import Document
 import os
 import tempfile
+import threading
 
 class TextConverter:
     def __init__(self):
-        pass
+        # The offline TTS engine is expensive to start and not thread-safe,
+        # so one engine is kept per converter and used under a lock
+        self._tts_engine = None
+        self._tts_lock = threading.Lock()
+    
+    def load(self, text_file_path):
+        """Read a text file for in-memory processing"""
+        return self._read_text(text_file_path)
+    
+    def _read_text(self, source):
+        """Read a text file, or a text stream handed over by a pipeline step"""
+        if hasattr(source, 'read'):
+            return source.read()
+        with open(source, 'r', encoding='utf-8') as file:
+            return file.read()
     
     def text_to_audio(self, text_file_path, output_path, engine='gtts'):
         """Convert text file to audio"""
         try:
             # Read text content
-            with open(text_file_path, 'r', encoding='utf-8') as file:
-                text_content = file.read()
+            text_content = self._read_text(text_file_path)
             
             if not text_content.strip():
                 raise Exception("No text content found in file")
@@ -43,36 +57,32 @@ class TextConverter:
     
     def _text_to_audio_offline(self, text, output_path):
         """Convert text to audio using offline TTS"""
-        engine = pyttsx3.init()
-        
-        # Configure voice properties
-        voices = engine.getProperty('voices')
-        if voices:
-            engine.setProperty('voice', voices[0].id)  # Use first available voice
-        
-        engine.setProperty('rate', 150)    # Speed of speech
-        engine.setProperty('volume', 0.9)  # Volume level (0.0 to 1.0)
-        
-        # Save to file
-        engine.save_to_file(text, output_path)
-        engine.runAndWait()
+        with self._tts_lock:
+            engine = self._get_tts_engine()
+            
+            # Save to file
+            engine.save_to_file(text, output_path)
+            engine.runAndWait()
+    
+    def _get_tts_engine(self):
+        """Get the offline TTS engine, starting it on first use"""
+        if self._tts_engine is None:
+            engine = pyttsx3.init()
+            
+            # Configure voice properties
+            voices = engine.getProperty('voices')
+            if voices:
+                engine.setProperty('voice', voices[0].id)  # Use first available voice
+            
+            engine.setProperty('rate', 150)    # Speed of speech
+            engine.setProperty('volume', 0.9)  # Volume level (0.0 to 1.0)
+            self._tts_engine = engine
+        return self._tts_engine
     
     def docx_to_txt(self, docx_path, output_path):
         """Convert DOCX to plain text"""
         try:
-            doc = Document(docx_path)
-            text_content = ""
-            
-            # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                text_content += paragraph.text + "\n"
-            
-            # Extract text from tables
-            for table in doc.tables:
-                for row in table.rows:
-                    for cell in row.cells:
-                        text_content += cell.text + "\t"
-                    text_content += "\n"
+            text_content = self.extract_docx_text(docx_path)
             
             # Save as text file
             with open(output_path, 'w', encoding='utf-8') as txt_file:
@@ -83,12 +93,29 @@ class TextConverter:
         except Exception as e:
             raise Exception(f"DOCX to TXT conversion failed: {str(e)}")
     
+    def extract_docx_text(self, docx_path):
+        """Extract the text of a DOCX document's paragraphs and tables"""
+        doc = Document(docx_path)
+        text_content = ""
+        
+        # Extract text from paragraphs
+        for paragraph in doc.paragraphs:
+            text_content += paragraph.text + "\n"
+        
+        # Extract text from tables
+        for table in doc.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    text_content += cell.text + "\t"
+                text_content += "\n"
+        
+        return text_content
+    
     def txt_to_docx(self, txt_path, output_path):
         """Convert plain text to DOCX"""
         try:
             # Read text content
-            with open(txt_path, 'r', encoding='utf-8') as txt_file:
-                text_content = txt_file.read()
+            text_content = self._read_text(txt_path)
             
             # Create new document
             doc = Document()
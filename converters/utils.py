@@ -1,11 +1,21 @@
 import os
+import io
+import json
+import queue
+import atexit
 import shutil
+import zipfile
 import tempfile
 import logging
+import logging.handlers
 import mimetypes
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from pathlib import Path
 import hashlib
+from .reaper import ExpiryReaper
+from .conversions import get_conversion, get_conversions_for
 
 class FileValidator:
     """Utility class for file validation"""
@@ -28,6 +38,30 @@ class FileValidator:
         'video': 200 * 1024 * 1024     # 200MB
     }
     
+    # Leading bytes expected for each extension as (offset, signature);
+    # an offset of None means anywhere in the first KB of the file.
+    # Formats without a reliable signature (txt, mp3, aac) are not checked.
+    MAGIC_NUMBERS = {
+        '.pdf': [(None, b'%PDF-')],
+        '.docx': [(0, b'PK\x03\x04')],
+        '.jpg': [(0, b'\xff\xd8\xff')],
+        '.jpeg': [(0, b'\xff\xd8\xff')],
+        '.png': [(0, b'\x89PNG\r\n\x1a\n')],
+        '.gif': [(0, b'GIF87a'), (0, b'GIF89a')],
+        '.bmp': [(0, b'BM')],
+        '.tiff': [(0, b'II*\x00'), (0, b'MM\x00*')],
+        '.wav': [(8, b'WAVE')],
+        '.ogg': [(0, b'OggS')],
+        '.flac': [(0, b'fLaC'), (0, b'ID3')],
+        '.m4a': [(4, b'ftyp')],
+        '.mp4': [(4, b'ftyp'), (4, b'moov'), (4, b'mdat'), (4, b'free'), (4, b'wide')],
+        '.mov': [(4, b'ftyp'), (4, b'moov'), (4, b'mdat'), (4, b'free'), (4, b'wide')],
+        '.avi': [(8, b'AVI ')],
+        '.wmv': [(0, b'\x30\x26\xb2\x75')],
+        '.flv': [(0, b'FLV')],
+        '.webm': [(0, b'\x1a\x45\xdf\xa3')]
+    }
+    
     @classmethod
     def is_valid_file(cls, file_path):
         """Check if file is valid and supported"""
@@ -47,12 +81,54 @@ class FileValidator:
         if file_type == 'unknown':
             return False, f"Unsupported file type: {file_extension}"
         
-        max_size = cls.MAX_FILE_SIZES.get(file_type, 50 * 1024 * 1024)
+        max_size = cls.get_max_size(file_type)
+        if file_size > max_size:
+            return False, f"File too large. Maximum size for {file_type}: {max_size // (1024*1024)}MB"
+        
+        return True, "File is valid"
+    
+    @classmethod
+    def is_valid_upload(cls, filename, file_size, header=None):
+        """Check an upload from the size and header captured while it was saved"""
+        if file_size == 0:
+            return False, "File is empty"
+        
+        file_extension = Path(filename).suffix.lower()
+        file_type = cls.get_file_type(file_extension)
+        
+        if file_type == 'unknown':
+            return False, f"Unsupported file type: {file_extension}"
+        
+        max_size = cls.get_max_size(file_type)
         if file_size > max_size:
             return False, f"File too large. Maximum size for {file_type}: {max_size // (1024*1024)}MB"
         
+        if header is not None and not cls.matches_magic_number(file_extension, header):
+            return False, f"File content does not match its {file_extension} extension"
+        
         return True, "File is valid"
     
+    @classmethod
+    def matches_magic_number(cls, file_extension, header):
+        """Check the first bytes of a file against the signatures for its extension"""
+        signatures = cls.MAGIC_NUMBERS.get(file_extension.lower())
+        if not signatures:
+            return True
+        
+        for offset, signature in signatures:
+            if offset is None:
+                if signature in header[:1024]:
+                    return True
+            elif header[offset:offset + len(signature)] == signature:
+                return True
+        
+        return False
+    
+    @classmethod
+    def get_max_size(cls, file_type):
+        """Get the maximum upload size for a file type"""
+        return cls.MAX_FILE_SIZES.get(file_type, 50 * 1024 * 1024)
+    
     @classmethod
     def get_file_type(cls, file_extension):
         """Get file type category from extension"""
@@ -67,79 +143,137 @@ class FileValidator:
     @classmethod
     def get_supported_conversions(cls, file_type):
         """Get list of supported conversions for a file type"""
-        conversions = {
-            'pdf': ['pdf_to_docx', 'pdf_to_txt', 'pdf_to_audio'],
-            'document': ['text_to_audio', 'txt_to_docx', 'docx_to_txt'],
-            'image': [
-                'image_to_pdf', 'image_to_text', 'image_resize', 'image_format', 
-                'image_compress', 'image_filter', 'image_rotate', 'image_collage'
-            ],
-            'audio': [
-                'audio_to_text', 'audio_format', 'audio_compress', 'audio_merge', 
-                'audio_trim', 'audio_speed', 'audio_normalize'
-            ],
-            'video': ['video_to_audio']
-        }
-        
-        return conversions.get(file_type, [])
+        return get_conversions_for(file_type)
     
     @classmethod
     def validate_conversion_type(cls, file_type, conversion_type):
         """Validate if conversion type is supported for file type"""
-        supported_conversions = cls.get_supported_conversions(file_type)
-        return conversion_type in supported_conversions
+        spec = get_conversion(conversion_type)
+        return spec is not None and spec.input_type == file_type
+
+
+class JsonLogFormatter(logging.Formatter):
+    """Format log records as one JSON object per line"""
+    
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'event': getattr(record, 'event', None),
+            'message': record.getMessage()
+        }
+        entry.update(getattr(record, 'fields', {}))
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
 
 
 class ConversionLogger:
-    """Logger for conversion operations"""
+    """Logger for conversion operations
     
-    def __init__(self, log_file='conversion.log'):
+    With ``structured`` each record is written as a JSON line carrying the
+    extra fields passed to the log methods (job id, input hash, stage
+    timings, sizes). With ``async_mode`` callers only put the record on a
+    queue and a background listener thread does the file I/O.
+    """
+    
+    def __init__(self, log_file='conversion.log', structured=True, async_mode=True):
         self.logger = logging.getLogger('file_converter')
         self.logger.setLevel(logging.INFO)
-        
-        # Create file handler
-        handler = logging.FileHandler(log_file)
-        handler.setLevel(logging.INFO)
-        
-        # Create formatter
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        handler.setFormatter(formatter)
-        
-        # Add handler to logger
-        if not self.logger.handlers:
-            self.logger.addHandler(handler)
+        self.log_file = log_file
+        self.structured = structured
+        self.async_mode = async_mode
+        self.listener = None
+        self.lock = threading.Lock()
+        self._pid = None
     
-    def log_conversion_start(self, input_file, conversion_type):
+    def log_conversion_start(self, input_file, conversion_type, **fields):
         """Log start of conversion"""
-        self.logger.info(f"Starting conversion: {input_file} -> {conversion_type}")
+        self._log(logging.INFO, 'conversion_start',
+                  f"Starting conversion: {input_file} -> {conversion_type}",
+                  input_file=input_file, conversion_type=conversion_type, **fields)
     
-    def log_conversion_success(self, input_file, output_file, conversion_type, duration):
+    def log_conversion_success(self, input_file, output_file, conversion_type, duration, **fields):
         """Log successful conversion"""
-        self.logger.info(
-            f"Conversion successful: {input_file} -> {output_file} "
-            f"({conversion_type}) in {duration:.2f} seconds"
-        )
+        self._log(logging.INFO, 'conversion_success',
+                  f"Conversion successful: {input_file} -> {output_file} "
+                  f"({conversion_type}) in {duration:.2f} seconds",
+                  input_file=input_file, output_file=output_file,
+                  conversion_type=conversion_type, duration=round(duration, 4), **fields)
     
-    def log_conversion_error(self, input_file, conversion_type, error):
+    def log_conversion_error(self, input_file, conversion_type, error, **fields):
         """Log conversion error"""
-        self.logger.error(
-            f"Conversion failed: {input_file} ({conversion_type}) - {str(error)}"
-        )
+        self._log(logging.ERROR, 'conversion_error',
+                  f"Conversion failed: {input_file} ({conversion_type}) - {str(error)}",
+                  input_file=input_file, conversion_type=conversion_type, error=str(error),
+                  **fields)
     
     def log_file_validation_error(self, file_path, error):
         """Log file validation error"""
-        self.logger.warning(f"File validation failed: {file_path} - {error}")
+        self._log(logging.WARNING, 'validation_error',
+                  f"File validation failed: {file_path} - {error}",
+                  input_file=file_path, error=str(error))
+    
+    def stop(self):
+        """Write out queued records and stop the listener thread"""
+        with self.lock:
+            listener = self.listener if self._pid == os.getpid() else None
+            self.listener = None
+        if listener is not None:
+            listener.stop()
+    
+    def _log(self, level, event, message, **fields):
+        self._ensure_started()
+        fields = {key: value for key, value in fields.items() if value is not None}
+        self.logger.log(level, message, extra={'event': event, 'fields': fields})
+    
+    def _ensure_started(self):
+        # Handlers are attached on first use in each process: the listener
+        # thread does not survive a fork, and processes that never log
+        # (e.g. conversion workers) don't open the log file at all
+        if self._pid == os.getpid():
+            return
+        
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            
+            handler = logging.FileHandler(self.log_file)
+            handler.setLevel(logging.INFO)
+            if self.structured:
+                handler.setFormatter(JsonLogFormatter())
+            else:
+                handler.setFormatter(logging.Formatter(
+                    '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+                ))
+            
+            if self.async_mode:
+                log_queue = queue.SimpleQueue()
+                self.listener = logging.handlers.QueueListener(log_queue, handler,
+                                                               respect_handler_level=True)
+                self.listener.start()
+                atexit.register(self.stop)
+                handler = logging.handlers.QueueHandler(log_queue)
+            
+            for old_handler in list(self.logger.handlers):
+                self.logger.removeHandler(old_handler)
+            self.logger.addHandler(handler)
+            self._pid = os.getpid()
 
 
 class TempFileManager:
-    """Manager for temporary files and cleanup"""
+    """Manager for temporary files and cleanup
+    
+    Temp files are scheduled on an ExpiryReaper, which deletes them in the
+    background once they are ``max_age_hours`` old.
+    """
     
-    def __init__(self, temp_dir=None, max_age_hours=1):
+    def __init__(self, temp_dir=None, max_age_hours=1, reaper=None):
         self.temp_dir = temp_dir or tempfile.gettempdir()
         self.max_age = timedelta(hours=max_age_hours)
         self.managed_files = set()
+        self.reaper = reaper or ExpiryReaper(self.max_age)
+        self.reaper.add_listener(self._forget)
     
     def create_temp_file(self, suffix='', prefix='converter_'):
         """Create a temporary file"""
@@ -152,13 +286,13 @@ class TempFileManager:
         temp_path = temp_file.name
         temp_file.close()
         
-        self.managed_files.add(temp_path)
+        self._manage(temp_path)
         return temp_path
     
     def create_temp_dir(self, prefix='converter_'):
         """Create a temporary directory"""
         temp_dir = tempfile.mkdtemp(prefix=prefix, dir=self.temp_dir)
-        self.managed_files.add(temp_dir)
+        self._manage(temp_dir)
         return temp_dir
     
     def cleanup_file(self, file_path):
@@ -170,28 +304,15 @@ class TempFileManager:
                 shutil.rmtree(file_path)
             
             self.managed_files.discard(file_path)
+            self.reaper.untrack(file_path)
             return True
         except Exception:
             return False
     
     def cleanup_old_files(self):
-        """Clean up old temporary files"""
-        current_time = datetime.now()
-        cleaned_count = 0
-        
-        for file_path in list(self.managed_files):
-            try:
-                if os.path.exists(file_path):
-                    file_time = datetime.fromtimestamp(os.path.getmtime(file_path))
-                    if current_time - file_time > self.max_age:
-                        if self.cleanup_file(file_path):
-                            cleaned_count += 1
-                else:
-                    self.managed_files.discard(file_path)
-            except Exception:
-                continue
-        
-        return cleaned_count
+        """Clean up expired files now instead of waiting for the reaper"""
+        removed = self.reaper.reap(limit=self.reaper.get_stats()['heap_size'])
+        return removed.get('temp', 0)
     
     def cleanup_all(self):
         """Clean up all managed files"""
@@ -201,6 +322,14 @@ class TempFileManager:
                 cleaned_count += 1
         return cleaned_count
     
+    def _manage(self, path):
+        self.managed_files.add(path)
+        self.reaper.track(path, 'temp', lifetime=self.max_age.total_seconds())
+    
+    def _forget(self, path, kind):
+        if kind == 'temp':
+            self.managed_files.discard(path)
+    
     def __del__(self):
         """Cleanup on destruction"""
         self.cleanup_all()
@@ -209,17 +338,50 @@ class TempFileManager:
 class FileHasher:
     """Utility for generating file hashes"""
     
+    # Recently computed hashes keyed by (path, size, mtime, algorithm)
+    HASH_CACHE_SIZE = 1024
+    _hash_cache = OrderedDict()
+    _hash_cache_lock = threading.Lock()
+    
     @staticmethod
-    def get_file_hash(file_path, algorithm='md5'):
+    def get_file_hash(file_path, algorithm='md5', chunk_size=1024 * 1024):
         """Generate hash for a file"""
         hash_obj = hashlib.new(algorithm)
         
         with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
+            for chunk in iter(lambda: f.read(chunk_size), b""):
                 hash_obj.update(chunk)
         
         return hash_obj.hexdigest()
     
+    @classmethod
+    def get_cached_hash(cls, file_path, algorithm='sha256'):
+        """Get a file hash, reading the file only if it changed since last time"""
+        key = cls._hash_cache_key(file_path, algorithm)
+        with cls._hash_cache_lock:
+            if key in cls._hash_cache:
+                cls._hash_cache.move_to_end(key)
+                return cls._hash_cache[key]
+        
+        file_hash = cls.get_file_hash(file_path, algorithm)
+        cls.remember_hash(file_path, file_hash, algorithm)
+        return file_hash
+    
+    @classmethod
+    def remember_hash(cls, file_path, file_hash, algorithm='sha256'):
+        """Record a hash computed elsewhere (e.g. while the file was written)"""
+        key = cls._hash_cache_key(file_path, algorithm)
+        with cls._hash_cache_lock:
+            cls._hash_cache[key] = file_hash
+            cls._hash_cache.move_to_end(key)
+            while len(cls._hash_cache) > cls.HASH_CACHE_SIZE:
+                cls._hash_cache.popitem(last=False)
+    
+    @staticmethod
+    def _hash_cache_key(file_path, algorithm):
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns, algorithm)
+    
     @staticmethod
     def compare_files(file1, file2):
         """Compare two files using hash"""
@@ -231,63 +393,194 @@ class FileHasher:
             return False
 
 
-class ConversionStats:
-    """Track conversion statistics"""
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable buffer that a ZipFile can stream into"""
     
     def __init__(self):
-        self.stats = {
+        super().__init__()
+        self.chunks = []
+        self.position = 0
+    
+    def writable(self):
+        return True
+    
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self.position
+    
+    def drain(self):
+        """Take everything written since the last drain"""
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+class ZipStreamer:
+    """Build ZIP archives on the fly without holding them on disk or in memory"""
+    
+    # Formats that are already compressed and gain nothing from deflate
+    STORED_EXTENSIONS = {
+        '.jpg', '.jpeg', '.png', '.gif', '.mp3', '.ogg', '.m4a', '.aac',
+        '.flac', '.mp4', '.mov', '.docx', '.zip'
+    }
+    
+    @classmethod
+    def stream(cls, entries, chunk_size=1024 * 1024):
+        """Yield the bytes of a ZIP archive as its entries are added
+        
+        ``entries`` is an iterable of ``(arcname, source)`` pairs where
+        ``source`` is a file path or a bytes object. It is consumed lazily,
+        so entries can be produced while the archive is being sent; when the
+        iterable asks for the next entry the previous one is fully written.
+        Only about one chunk of data is buffered at any time.
+        """
+        sink = _ZipSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+            for arcname, source in entries:
+                if isinstance(source, bytes):
+                    zip_file.writestr(arcname, source)
+                else:
+                    info = cls._get_zip_info(source, arcname)
+                    force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+                    with open(source, 'rb') as source_file, \
+                            zip_file.open(info, 'w', force_zip64=force_zip64) as target:
+                        for chunk in iter(lambda: source_file.read(chunk_size), b""):
+                            target.write(chunk)
+                            data = sink.drain()
+                            if data:
+                                yield data
+                
+                data = sink.drain()
+                if data:
+                    yield data
+        
+        # Central directory
+        data = sink.drain()
+        if data:
+            yield data
+    
+    @classmethod
+    def _get_zip_info(cls, file_path, arcname):
+        info = zipfile.ZipInfo.from_file(file_path, arcname)
+        if Path(file_path).suffix.lower() in cls.STORED_EXTENSIONS:
+            info.compress_type = zipfile.ZIP_STORED
+        else:
+            info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+
+class ConversionStats:
+    """Track conversion statistics
+    
+    Counts are kept as flat ``(name, label)`` counters. With a ``store``
+    (see ``converters.stats.StatsStore``) they are buffered and shared by
+    all worker processes; without one they live in this process only.
+    """
+    
+    def __init__(self, store=None):
+        self.store = store
+        self.lock = threading.Lock()
+        self.counters = {}
+    
+    @property
+    def stats(self):
+        """Statistics as a nested dict"""
+        stats = {
             'total_conversions': 0,
             'successful_conversions': 0,
             'failed_conversions': 0,
             'conversion_types': {},
             'file_types': {},
-            'total_size_processed': 0
+            'total_size_processed': 0,
+            'cache_hits': 0,
+            'cache_misses': 0
         }
+        
+        # Per-type counters are labelled; '<group>_success' holds their successes
+        for (name, label), value in self._get_counters().items():
+            if label:
+                group, field = (name[:-len('_success')], 'success') if name.endswith('_success') else (name, 'count')
+                stats[group].setdefault(label, {'count': 0, 'success': 0})[field] = value
+            elif name in stats:
+                stats[name] = value
+        return stats
     
-    def record_conversion_start(self, file_path, file_type, conversion_type):
+    def record_conversion_start(self, file_path, file_type, conversion_type, file_size=None):
         """Record the start of a conversion"""
-        self.stats['total_conversions'] += 1
-        
-        # Update conversion type stats
-        if conversion_type not in self.stats['conversion_types']:
-            self.stats['conversion_types'][conversion_type] = {'count': 0, 'success': 0}
-        self.stats['conversion_types'][conversion_type]['count'] += 1
-        
-        # Update file type stats
-        if file_type not in self.stats['file_types']:
-            self.stats['file_types'][file_type] = {'count': 0, 'success': 0}
-        self.stats['file_types'][file_type]['count'] += 1
+        # Stat the file only if the caller doesn't know its size
+        if file_size is None and os.path.exists(file_path):
+            file_size = os.path.getsize(file_path)
         
-        # Add file size
-        if os.path.exists(file_path):
-            self.stats['total_size_processed'] += os.path.getsize(file_path)
+        self._increment('total_conversions')
+        self._increment('conversion_types', label=conversion_type)
+        self._increment('file_types', label=file_type)
+        if file_size:
+            self._increment('total_size_processed', file_size)
     
     def record_conversion_success(self, conversion_type, file_type):
         """Record a successful conversion"""
-        self.stats['successful_conversions'] += 1
-        self.stats['conversion_types'][conversion_type]['success'] += 1
-        self.stats['file_types'][file_type]['success'] += 1
+        self._increment('successful_conversions')
+        self._increment('conversion_types_success', label=conversion_type)
+        self._increment('file_types_success', label=file_type)
     
     def record_conversion_failure(self):
         """Record a failed conversion"""
-        self.stats['failed_conversions'] += 1
+        self._increment('failed_conversions')
     
-    def get_success_rate(self):
+    def record_cache_lookup(self, hit):
+        """Record a result cache hit or miss"""
+        self._increment('cache_hits' if hit else 'cache_misses')
+    
+    def get_cache_hit_rate(self, stats=None):
+        """Get result cache hit rate"""
+        stats = stats or self.stats
+        lookups = stats['cache_hits'] + stats['cache_misses']
+        if lookups == 0:
+            return 0
+        return (stats['cache_hits'] / lookups) * 100
+    
+    def get_success_rate(self, stats=None):
         """Get overall success rate"""
-        if self.stats['total_conversions'] == 0:
+        stats = stats or self.stats
+        if stats['total_conversions'] == 0:
             return 0
-        return (self.stats['successful_conversions'] / self.stats['total_conversions']) * 100
+        return (stats['successful_conversions'] / stats['total_conversions']) * 100
     
     def get_stats_summary(self):
         """Get summary of statistics"""
+        # Read the counters once so the summary is a consistent snapshot
+        stats = self.stats
         return {
-            'total_conversions': self.stats['total_conversions'],
-            'success_rate': f"{self.get_success_rate():.1f}%",
-            'total_size_processed': self._format_size(self.stats['total_size_processed']),
-            'most_popular_conversion': self._get_most_popular_conversion(),
-            'most_processed_file_type': self._get_most_processed_file_type()
+            'total_conversions': stats['total_conversions'],
+            'success_rate': f"{self.get_success_rate(stats):.1f}%",
+            'total_size_processed': self._format_size(stats['total_size_processed']),
+            'most_popular_conversion': self._get_most_popular_conversion(stats),
+            'most_processed_file_type': self._get_most_processed_file_type(stats),
+            'cache': {
+                'hits': stats['cache_hits'],
+                'misses': stats['cache_misses'],
+                'hit_rate': f"{self.get_cache_hit_rate(stats):.1f}%"
+            }
         }
     
+    def _increment(self, name, amount=1, label=''):
+        if self.store is not None:
+            self.store.add(name, amount, label)
+            return
+        key = (name, label)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+    
+    def _get_counters(self):
+        if self.store is not None:
+            return self.store.get_counters()
+        with self.lock:
+            return dict(self.counters)
+    
     def _format_size(self, size_bytes):
         """Format size in human readable format"""
         for unit in ['B', 'KB', 'MB', 'GB']:
@@ -296,24 +589,24 @@ class ConversionStats:
             size_bytes /= 1024.0
         return f"{size_bytes:.1f} TB"
     
-    def _get_most_popular_conversion(self):
+    def _get_most_popular_conversion(self, stats):
         """Get most popular conversion type"""
-        if not self.stats['conversion_types']:
+        if not stats['conversion_types']:
             return 'None'
         
         most_popular = max(
-            self.stats['conversion_types'].items(),
+            stats['conversion_types'].items(),
             key=lambda x: x[1]['count']
         )
         return most_popular[0]
     
-    def _get_most_processed_file_type(self):
+    def _get_most_processed_file_type(self, stats):
         """Get most processed file type"""
-        if not self.stats['file_types']:
+        if not stats['file_types']:
             return 'None'
         
         most_processed = max(
-            self.stats['file_types'].items(),
+            stats['file_types'].items(),
             key=lambda x: x[1]['count']
         )
         return most_processed[0]